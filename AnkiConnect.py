@@ -27,22 +27,39 @@ import re
 import select
 import socket
 import sys
+import threading
+import zlib
+from collections import OrderedDict
 from time import time
 from unicodedata import normalize
 from operator import itemgetter
 
+try:
+    import selectors
+except ImportError:
+    selectors = None
+
 
 #
 # Constants
 #
 
 API_VERSION = 5
+AUDIO_CACHE_SIZE = 32 * 1024 * 1024
+AUDIO_WORKERS = 4
+COMPRESS_MIN_SIZE = 1024
+STREAM_CHUNK_SIZE = 65536
+STREAM_MIN_ITEMS = 256
+KEEP_ALIVE_TIMEOUT = 15
+TICK_BUDGET = float(os.getenv('ANKICONNECT_TICK_BUDGET', 0.05))
 TICK_INTERVAL = 25
 URL_TIMEOUT = 10
 URL_UPGRADE = 'https://raw.githubusercontent.com/FooSoft/anki-connect/master/AnkiConnect.py'
 NET_ADDRESS = os.getenv('ANKICONNECT_BIND_ADDRESS', '127.0.0.1')
-NET_BACKLOG = 5
+NET_BACKLOG = int(os.getenv('ANKICONNECT_BACKLOG', 128))
 NET_PORT = 8765
+NET_RECV_SIZE = int(os.getenv('ANKICONNECT_RECV_SIZE', 65536))
+SQL_CHUNK_SIZE = 10000
 
 
 #
@@ -53,7 +70,9 @@ if sys.version_info[0] < 3:
     import urllib2
     web = urllib2
 
-    from PyQt4.QtCore import QTimer
+    import Queue as queue
+
+    from PyQt4.QtCore import QObject, QTimer, pyqtSignal
     from PyQt4.QtGui import QMessageBox
 else:
     unicode = str
@@ -61,7 +80,9 @@ else:
     from urllib import request
     web = request
 
-    from PyQt5.QtCore import QTimer
+    import queue
+
+    from PyQt5.QtCore import QObject, QTimer, pyqtSignal
     from PyQt5.QtWidgets import QMessageBox
 
 
@@ -78,6 +99,12 @@ def webApi(*versions):
     return decorator
 
 
+def chunked(items, size=SQL_CHUNK_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
 def makeBytes(data):
     return data.encode('utf-8')
 
@@ -98,12 +125,55 @@ def download(url):
     return resp.read()
 
 
+def whenReady(value, func):
+    # Applies func to a handler result now, or once it resolves when the
+    # result is an AsyncResult (giving another AsyncResult).
+    if isinstance(value, AsyncResult):
+        return value.map(func)
+    return func(value)
+
+
 def audioInject(note, fields, filename):
     for field in fields:
         if field in note:
             note[field] += u'[sound:{}]'.format(filename)
 
 
+def acceptedEncodings(value):
+    encodings = []
+    for token in makeStr(value or bytes()).lower().split(','):
+        parts = token.split(';')
+        name = parts[0].strip()
+        quality = 1.0
+        for param in parts[1:]:
+            param = param.strip()
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            encodings.append(name)
+    return encodings
+
+
+def compressor(encoding):
+    if encoding == 'gzip':
+        return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return zlib.compressobj(6)
+
+
+def compress(data, encoding):
+    stream = compressor(encoding)
+    return stream.compress(data) + stream.flush()
+
+
+def decompress(data, encoding):
+    if encoding == 'gzip':
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    return zlib.decompress(data)
+
+
 def verifyString(string):
     t = type(string)
     return t == str or t == unicode
@@ -123,9 +193,11 @@ def verifyStringList(strings):
 #
 
 class AjaxRequest:
-    def __init__(self, headers, body):
+    def __init__(self, headers, body, keepAlive=False, chunked=False):
         self.headers = headers
         self.body = body
+        self.keepAlive = keepAlive
+        self.chunked = chunked
 
 
 #
@@ -136,67 +208,204 @@ class AjaxClient:
     def __init__(self, sock, handler):
         self.sock = sock
         self.handler = handler
-        self.readBuff = bytes()
-        self.writeBuff = bytes()
+        self.readBuff = bytearray()
+        self.writeBuff = bytearray()
+        self.writeOffset = 0
+        self.stream = None
+        self.scanned = 0
+        self.pending = None
+        self.keepAlive = True
+        self.busy = False
+        self.processing = False
+        self.events = 0
+        self.onClose = None
+        self.lastActive = time()
+
+
+    def advance(self, recvSize=NET_RECV_SIZE, deadline=None):
+        if self.sock is None:
+            return False
 
+        rlist, wlist = select.select([self.sock], [self.sock], [], 0)[:2]
+
+        if rlist and not self.onReadable(recvSize, deadline):
+            return False
 
-    def advance(self, recvSize=1024):
+        # Requests left over when the previous tick ran out of time.
+        self.processRequests(deadline)
         if self.sock is None:
             return False
 
-        rlist, wlist = select.select([self.sock], [self.sock], [], 0)[:2]
+        if wlist and not self.onWritable():
+            return False
+
+        return not self.expire()
 
-        if rlist:
+
+    def onReadable(self, recvSize=NET_RECV_SIZE, deadline=None):
+        try:
             msg = self.sock.recv(recvSize)
-            if not msg:
-                self.close()
-                return False
+        except socket.error:
+            msg = None
+
+        if not msg:
+            self.close()
+            return False
+
+        self.readBuff.extend(msg)
+        self.lastActive = time()
+        self.processRequests(deadline)
+        return self.sock is not None
 
-            self.readBuff += msg
 
-            req, length = self.parseRequest(self.readBuff)
-            if req is not None:
-                self.readBuff = self.readBuff[length:]
-                self.writeBuff += self.handler(req)
+    def onWritable(self):
+        if not self.writeBuff and self.stream is not None:
+            self.pullStream()
 
-        if wlist and self.writeBuff:
-            length = self.sock.send(self.writeBuff)
-            self.writeBuff = self.writeBuff[length:]
-            if not self.writeBuff:
+        if self.writeBuff:
+            try:
+                length = self.sock.send(memoryview(self.writeBuff)[self.writeOffset:])
+            except socket.error:
                 self.close()
                 return False
 
+            # Advance an offset rather than slicing; the buffer is only
+            # cleared once everything queued in it has been sent.
+            self.writeOffset += length
+            if self.writeOffset == len(self.writeBuff):
+                del self.writeBuff[:]
+                self.writeOffset = 0
+            self.lastActive = time()
+
+        if not self.writeBuff and not self.keepAlive and not self.busy:
+            self.close()
+            return False
+
         return True
 
 
+    def pullStream(self):
+        # Streamed responses are produced one chunk at a time, only once
+        # the previous chunk has been sent.
+        try:
+            self.writeBuff.extend(next(self.stream))
+        except StopIteration:
+            self.stream = None
+            self.busy = False
+            self.processRequests()
+        except Exception:
+            # The response can't be completed; the client sees a truncated body.
+            self.stream = None
+            self.busy = False
+            self.keepAlive = False
+
+
+    def expire(self):
+        if not self.writeBuff and not self.busy and time() - self.lastActive > KEEP_ALIVE_TIMEOUT:
+            self.close()
+            return True
+
+        return False
+
+
+    def processRequests(self, deadline=None):
+        # One request at a time: the next one is parsed once this one's
+        # response has been queued by respond(), so pipelined requests are
+        # answered in order. Nothing is read past a non keep-alive request.
+        # When the handler answers synchronously, every complete request is
+        # handled here until the deadline passes.
+        if self.processing:
+            return
+
+        self.processing = True
+        try:
+            while not self.busy and self.keepAlive and self.sock is not None:
+                if deadline is not None and time() > deadline:
+                    break
+
+                req, length = self.parseRequest(self.readBuff)
+                if req is None:
+                    break
+
+                del self.readBuff[:length]
+                self.keepAlive = req.keepAlive
+                self.busy = True
+                self.handler(self, req)
+        finally:
+            self.processing = False
+
+
+    def respond(self, data, stream=None):
+        if self.sock is None:
+            return
+
+        # A streamed response keeps the client busy until it is exhausted.
+        self.busy = stream is not None
+        self.stream = stream
+        self.writeBuff.extend(data)
+        self.lastActive = time()
+        self.processRequests()
+
+
     def close(self):
         if self.sock is not None:
+            if self.onClose is not None:
+                self.onClose(self)
             self.sock.close()
             self.sock = None
 
-        self.readBuff = bytes()
-        self.writeBuff = bytes()
+        self.readBuff = bytearray()
+        self.writeBuff = bytearray()
+        self.writeOffset = 0
+        self.stream = None
+        self.scanned = 0
+        self.pending = None
 
 
     def parseRequest(self, data):
-        parts = data.split(makeBytes('\r\n\r\n'), 1)
-        if len(parts) == 1:
+        # Headers are parsed once; until the body is complete, each new chunk
+        # only costs a length check. The header search resumes where the
+        # previous one stopped.
+        if self.pending is None:
+            headerEnd = data.find(makeBytes('\r\n\r\n'), max(0, self.scanned - 3))
+            if headerEnd == -1:
+                self.scanned = len(data)
+                return None, 0
+
+            self.scanned = 0
+            self.pending = self.parseHeaders(bytes(data[:headerEnd]))
+
+        headers, keepAlive, chunked, headerLength, totalLength = self.pending
+        if totalLength > len(data):
             return None, 0
 
+        self.pending = None
+        body = bytes(data[headerLength : totalLength])
+        return AjaxRequest(headers, body, keepAlive, chunked), totalLength
+
+
+    def parseHeaders(self, head):
+        lines = head.split(makeBytes('\r\n'))
+        requestLine = lines[0].lower()
+
         headers = {}
-        for line in parts[0].split(makeBytes('\r\n')):
+        for line in lines:
             pair = line.split(makeBytes(': '))
             headers[pair[0].lower()] = pair[1] if len(pair) > 1 else None
 
-        headerLength = len(parts[0]) + 4
+        headerLength = len(head) + 4
         bodyLength = int(headers.get(makeBytes('content-length'), 0))
-        totalLength = headerLength + bodyLength
 
-        if totalLength > len(data):
-            return None, 0
+        # HTTP/1.1 connections are persistent unless the client opts out,
+        # HTTP/1.0 connections only when the client explicitly asks for it.
+        connection = (headers.get(makeBytes('connection')) or bytes()).lower()
+        chunked = requestLine.endswith(makeBytes('http/1.1'))
+        if chunked:
+            keepAlive = connection != makeBytes('close')
+        else:
+            keepAlive = connection == makeBytes('keep-alive')
 
-        body = data[headerLength : totalLength]
-        return AjaxRequest(headers, body), totalLength
+        return headers, keepAlive, chunked, headerLength, headerLength + bodyLength
 
 
 #
@@ -204,15 +413,25 @@ class AjaxClient:
 #
 
 class AjaxServer:
-    def __init__(self, handler):
+    def __init__(self, handler, executor=None):
         self.handler = handler
+        self.executor = executor
         self.clients = []
         self.sock = None
+        self.selector = None
+        self.thread = None
+        self.wakeReader = None
+        self.wakeWriter = None
+        self.completed = []
+        self.completedLock = threading.Lock()
         self.resetHeaders()
 
 
     def setHeader(self, name, value):
-        self.extraHeaders[name] = value
+        if value is None:
+            self.extraHeaders.pop(name, None)
+        else:
+            self.extraHeaders[name] = value
 
 
     def resetHeaders(self):
@@ -232,24 +451,38 @@ class AjaxServer:
 
 
     def advance(self):
-        if self.sock is not None:
-            self.acceptClients()
-            self.advanceClients()
+        if self.sock is not None and self.thread is None:
+            deadline = time() + TICK_BUDGET
+            self.acceptClients(deadline)
+            self.advanceClients(deadline)
 
 
-    def acceptClients(self):
-        rlist = select.select([self.sock], [], [], 0)[0]
-        if not rlist:
-            return
+    def acceptClients(self, deadline=None):
+        # Take every pending connection, not just one per tick.
+        accepted = []
+        while deadline is None or time() <= deadline:
+            client = self.acceptClient()
+            if client is None:
+                break
+            accepted.append(client)
+
+        return accepted
+
+
+    def acceptClient(self):
+        try:
+            clientSock = self.sock.accept()[0]
+        except socket.error:
+            return None
 
-        clientSock = self.sock.accept()[0]
-        if clientSock is not None:
-            clientSock.setblocking(False)
-            self.clients.append(AjaxClient(clientSock, self.handlerWrapper))
+        clientSock.setblocking(False)
+        client = AjaxClient(clientSock, self.dispatch)
+        self.clients.append(client)
+        return client
 
 
-    def advanceClients(self):
-        self.clients = list(filter(lambda c: c.advance(), self.clients))
+    def advanceClients(self, deadline=None):
+        self.clients = list(filter(lambda c: c.advance(deadline=deadline), self.clients))
 
 
     def listen(self):
@@ -262,42 +495,482 @@ class AjaxServer:
         self.sock.listen(NET_BACKLOG)
 
 
-    def handlerWrapper(self, req):
+    def start(self):
+        # Run socket I/O on a background thread; handler calls are passed to
+        # the executor (the Qt main thread). Without selectors (Python 2) the
+        # caller falls back to polling advance() from a timer.
+        if selectors is None or self.sock is None:
+            return False
+
+        self.selector = selectors.DefaultSelector()
+        self.wakeReader, self.wakeWriter = socket.socketpair()
+        self.wakeReader.setblocking(False)
+        self.wakeWriter.setblocking(False)
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        self.selector.register(self.wakeReader, selectors.EVENT_READ)
+
+        self.thread = threading.Thread(target=self.run, name='AnkiConnect')
+        self.thread.daemon = True
+        self.thread.start()
+        return True
+
+
+    def run(self):
+        sock, selector = self.sock, self.selector
+        while self.sock is sock:
+            for key, mask in selector.select(self.nextTimeout()):
+                if key.fileobj is sock:
+                    for client in self.acceptClients(time() + TICK_BUDGET):
+                        client.events = selectors.EVENT_READ
+                        client.onClose = self.unwatch
+                        selector.register(client.sock, client.events, client)
+                elif key.fileobj is self.wakeReader:
+                    self.drainWakeups()
+                else:
+                    client = key.data
+                    try:
+                        if mask & selectors.EVENT_READ and client.sock is not None:
+                            client.onReadable()
+                        if mask & selectors.EVENT_WRITE and client.sock is not None:
+                            client.onWritable()
+                    except Exception:
+                        # A request that can't be handled (e.g. a malformed
+                        # header) costs its own connection, not the I/O thread.
+                        client.close()
+
+            if self.sock is not sock:
+                break
+
+            for client in self.clients:
+                if client.sock is not None:
+                    client.expire()
+            self.watchClients()
+
+        for client in self.clients:
+            client.close()
+        self.clients = []
+
+        selector.close()
+        self.wakeReader.close()
+        self.wakeWriter.close()
+
+
+    def nextTimeout(self):
+        deadlines = [c.lastActive + KEEP_ALIVE_TIMEOUT for c in self.clients if not c.writeBuff and not c.busy]
+        if not deadlines:
+            return None
+        return max(0, min(deadlines) - time()) + 0.01
+
+
+    def watchClients(self):
+        clients = []
+        for client in self.clients:
+            if client.sock is None:
+                continue
+
+            events = selectors.EVENT_READ
+            if client.writeBuff or client.stream is not None:
+                events |= selectors.EVENT_WRITE
+            if events != client.events:
+                self.selector.modify(client.sock, events, client)
+                client.events = events
+            clients.append(client)
+
+        self.clients = clients
+
+
+    def unwatch(self, client):
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+
+
+    def wake(self):
+        try:
+            self.wakeWriter.send(b'\0')
+        except socket.error:
+            pass
+
+
+    def drainWakeups(self):
+        try:
+            while self.wakeReader.recv(4096):
+                pass
+        except socket.error:
+            pass
+
+        with self.completedLock:
+            completed, self.completed = self.completed, []
+
+        for client, req, result in completed:
+            try:
+                self.sendResult(client, req, result)
+            except Exception:
+                client.close()
+
+
+    def dispatch(self, client, req):
         if len(req.body) == 0:
-            body = makeBytes('AnkiConnect v.{}'.format(API_VERSION))
+            client.respond(self.encodeResponse(req, makeBytes('AnkiConnect v.{}'.format(API_VERSION))))
+            return
+
+        try:
+            params = self.decodeRequest(req)
+        except (ValueError, zlib.error):
+            client.respond(self.encodeResponse(req, makeBytes(json.dumps(None))))
+            return
+
+        if self.thread is None or self.executor is None:
+            whenReady(self.handler(params), lambda result: self.sendResult(client, req, result))
         else:
-            try:
-                params = json.loads(makeStr(req.body))
-                body = makeBytes(json.dumps(self.handler(params)))
-            except ValueError:
-                body = makeBytes(json.dumps(None))
+            self.executor.submit(lambda: self.handler(params), lambda result: self.complete(client, req, result))
+
+
+    def complete(self, client, req, result):
+        # Called from the executor's thread; the I/O thread does the rest.
+        with self.completedLock:
+            self.completed.append((client, req, result))
+        self.wake()
+
+
+    def decodeRequest(self, req):
+        reqBody = req.body
+        reqEncoding = makeStr(req.headers.get(makeBytes('content-encoding')) or bytes()).strip().lower()
+        if reqEncoding in ('gzip', 'deflate'):
+            reqBody = decompress(reqBody, reqEncoding)
+
+        return json.loads(makeStr(reqBody))
+
+
+    def sendResult(self, client, req, result):
+        items = result.get('result') if isinstance(result, dict) else result
+        if req.chunked and isinstance(items, list) and len(items) >= STREAM_MIN_ITEMS:
+            encoding = self.chooseEncoding(req)
+            client.respond(self.encodeHeaders(req, encoding), self.streamResult(result, encoding))
+        else:
+            client.respond(self.encodeResponse(req, makeBytes(json.dumps(result))))
+
+
+    def streamResult(self, result, encoding):
+        # Serialize a large result list item by item and send it with chunked
+        # transfer encoding, so neither the JSON text nor the compressed
+        # body is ever held in memory in full.
+        if isinstance(result, dict):
+            items = result['result']
+            head, tail = '{"result": [', '], "error": ' + json.dumps(result['error']) + '}'
+        else:
+            items = result
+            head, tail = '[', ']'
+
+        stream = compressor(encoding) if encoding is not None else None
+        pending, size = [head], len(head)
+
+        for index, item in enumerate(items):
+            piece = json.dumps(item)
+            pending.append(', ' + piece if index else piece)
+            size += len(piece) + 2
+            if size >= STREAM_CHUNK_SIZE:
+                data = makeBytes(''.join(pending))
+                if stream is not None:
+                    data = stream.compress(data)
+                if data:
+                    yield self.encodeChunk(data)
+                pending, size = [], 0
+
+        pending.append(tail)
+        data = makeBytes(''.join(pending))
+        if stream is not None:
+            data = stream.compress(data) + stream.flush()
+        if data:
+            yield self.encodeChunk(data)
+        yield makeBytes('0\r\n\r\n')
+
+
+    def encodeChunk(self, data):
+        return makeBytes('{:x}\r\n'.format(len(data))) + data + makeBytes('\r\n')
+
+
+    def chooseEncoding(self, req):
+        accepted = acceptedEncodings(req.headers.get(makeBytes('accept-encoding')))
+        for candidate in ('gzip', 'deflate'):
+            if candidate in accepted:
+                return candidate
+        return None
 
-        resp = bytes()
 
-        self.setHeader('Content-Length', str(len(body)))
-        headers = self.getHeaders()
+    def encodeResponse(self, req, body):
+        encoding = None
+        if len(body) >= COMPRESS_MIN_SIZE:
+            encoding = self.chooseEncoding(req)
+            if encoding is not None:
+                body = compress(body, encoding)
 
-        for key, value in headers:
+        return bytes().join([self.encodeHeaders(req, encoding, len(body)), body])
+
+
+    def encodeHeaders(self, req, encoding, length=None):
+        # Without a length the body follows in chunked transfer encoding.
+        self.setHeader('Content-Encoding', encoding)
+        self.setHeader('Vary', 'Accept-Encoding')
+        self.setHeader('Content-Length', None if length is None else str(length))
+        self.setHeader('Transfer-Encoding', 'chunked' if length is None else None)
+        self.setHeader('Connection', 'keep-alive' if req.keepAlive else 'close')
+
+        resp = []
+        for key, value in self.getHeaders():
             if value is None:
-                resp += makeBytes('{}\r\n'.format(key))
+                resp.append(makeBytes('{}\r\n'.format(key)))
             else:
-                resp += makeBytes('{}: {}\r\n'.format(key, value))
+                resp.append(makeBytes('{}: {}\r\n'.format(key, value)))
 
-        resp += makeBytes('\r\n')
-        resp += body
-
-        return resp
+        resp.append(makeBytes('\r\n'))
+        return bytes().join(resp)
 
 
     def close(self):
-        if self.sock is not None:
-            self.sock.close()
-            self.sock = None
+        sock, self.sock = self.sock, None
 
-        for client in self.clients:
-            client.close()
+        if self.thread is not None:
+            # The I/O thread notices the listener is gone and closes its clients.
+            self.thread = None
+            self.wake()
+        else:
+            for client in self.clients:
+                client.close()
+            self.clients = []
 
-        self.clients = []
+        if sock is not None:
+            sock.close()
+
+
+#
+# AsyncResult
+#
+
+class AsyncResult:
+    # A handler result that is only known later, e.g. once a download has
+    # finished. It is resolved on the main thread; the server holds the
+    # client's response (and any requests pipelined behind it) until then.
+    def __init__(self):
+        self.done = False
+        self.value = None
+        self.error = None
+        self.callbacks = []
+
+
+    def resolve(self, value=None, error=None):
+        self.done = True
+        self.value = value
+        self.error = error
+
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback(value, error)
+
+
+    def then(self, callback):
+        if self.done:
+            callback(self.value, self.error)
+        else:
+            self.callbacks.append(callback)
+
+
+    def map(self, func):
+        # Errors skip func; an exception raised by func becomes the error.
+        result = AsyncResult()
+
+        def callback(value, error):
+            if error is not None:
+                result.resolve(error=error)
+                return
+            try:
+                value = func(value)
+            except Exception as e:
+                result.resolve(error=e)
+            else:
+                result.resolve(value)
+
+        self.then(callback)
+        return result
+
+
+    @staticmethod
+    def gather(values):
+        # A list that may hold AsyncResults becomes an AsyncResult of the list
+        # of their values; a list without any is returned as it is.
+        pending = [i for i, value in enumerate(values) if isinstance(value, AsyncResult)]
+        if not pending:
+            return values
+
+        result = AsyncResult()
+        values = list(values)
+        state = {'remaining': len(pending)}
+
+        def settle(index):
+            def callback(value, error):
+                values[index] = value
+                state['remaining'] -= 1
+                if state['remaining'] == 0:
+                    result.resolve(values)
+            return callback
+
+        for index in pending:
+            values[index].then(settle(index))
+
+        return result
+
+
+#
+# AudioDownloader
+#
+
+class AudioDownloader:
+    # Fetches audio on a pool of worker threads so the main thread never
+    # waits on the network. Downloaded data is cached by its md5, which also
+    # answers skipHash checks; a URL already being fetched is not fetched
+    # again. Results are handed back through the executor, on the main
+    # thread. Without an executor, downloads happen synchronously.
+    def __init__(self, executor=None, workers=AUDIO_WORKERS, cacheSize=AUDIO_CACHE_SIZE):
+        self.executor = executor
+        self.workers = workers
+        self.cacheSize = cacheSize
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.threads = []
+        self.digests = {}
+        self.blobs = OrderedDict()
+        self.blobsSize = 0
+        self.waiting = {}
+
+
+    def fetch(self, urls):
+        # Returns an AsyncResult of {url: (data, md5)}, (None, None) for
+        # failed downloads.
+        result = AsyncResult()
+        found = {}
+        missing = []
+
+        with self.lock:
+            for url in urls:
+                cached = self.lookup(url)
+                if cached is not None:
+                    found[url] = cached
+                else:
+                    missing.append(url)
+
+        if not missing:
+            result.resolve(found)
+            return result
+
+        if self.executor is None:
+            for url in missing:
+                found[url] = self.store(url, download(url))
+            result.resolve(found)
+            return result
+
+        state = {'remaining': len(missing)}
+
+        def arrived(url, entry):
+            # Runs on a worker thread.
+            with self.lock:
+                found[url] = entry
+                state['remaining'] -= 1
+                finished = state['remaining'] == 0
+            if finished:
+                self.executor.submit(lambda: found, result.resolve)
+
+        with self.lock:
+            self.startWorkers()
+            for url in missing:
+                if url in self.waiting:
+                    self.waiting[url].append(arrived)
+                else:
+                    self.waiting[url] = [arrived]
+                    self.queue.put(url)
+
+        return result
+
+
+    def lookup(self, url):
+        digest = self.digests.get(url)
+        if digest is None:
+            return None
+
+        data = self.blobs.get(digest)
+        if data is None:
+            # Evicted since it was downloaded.
+            del self.digests[url]
+            return None
+
+        # Most recently used entries are evicted last.
+        del self.blobs[digest]
+        self.blobs[digest] = data
+        return data, digest
+
+
+    def store(self, url, data):
+        if data is None:
+            return None, None
+
+        m = hashlib.md5()
+        m.update(data)
+        digest = m.hexdigest()
+
+        with self.lock:
+            self.digests[url] = digest
+            if digest not in self.blobs and len(data) <= self.cacheSize:
+                self.blobs[digest] = data
+                self.blobsSize += len(data)
+                while self.blobsSize > self.cacheSize:
+                    self.blobsSize -= len(self.blobs.popitem(last=False)[1])
+
+        return data, digest
+
+
+    def startWorkers(self):
+        while len(self.threads) < self.workers:
+            thread = threading.Thread(target=self.work, name='AnkiConnect audio')
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+
+    def work(self):
+        while True:
+            url = self.queue.get()
+            try:
+                entry = self.store(url, download(url))
+            except Exception:
+                entry = (None, None)
+
+            with self.lock:
+                callbacks = self.waiting.pop(url, [])
+            for callback in callbacks:
+                callback(url, entry)
+
+
+#
+# MainThreadExecutor
+#
+
+class MainThreadExecutor(QObject):
+    scheduled = pyqtSignal(object)
+
+    def __init__(self):
+        QObject.__init__(self)
+        self.scheduled.connect(self.run)
+
+
+    def submit(self, func, callback):
+        # Emitted from the I/O thread, the signal is queued and run() executes
+        # on the thread this object lives in: the Qt main thread.
+        self.scheduled.emit((func, callback))
+
+
+    def run(self, task):
+        func, callback = task
+        whenReady(func(), callback)
 
 
 #
@@ -310,6 +983,7 @@ class AnkiNoteParams:
         self.modelName = params.get('modelName')
         self.fields = params.get('fields', {})
         self.tags = params.get('tags', [])
+        self.allowDuplicate = (params.get('options') or {}).get('allowDuplicate', False) is True
 
         class Audio:
             def __init__(self, params):
@@ -344,6 +1018,10 @@ class AnkiNoteParams:
 #
 
 class AnkiBridge:
+    def __init__(self, downloader=None):
+        self.downloader = downloader or AudioDownloader()
+
+
     def storeMediaFile(self, filename, data):
         self.deleteMediaFile(filename)
         self.media().writeData(filename, base64.b64decode(data))
@@ -368,34 +1046,65 @@ class AnkiBridge:
 
 
     def addNote(self, params):
+        return whenReady(self.addNotes([params]), itemgetter(0))
+
+
+    def addNotes(self, notes):
+        # Audio is downloaded off the main thread first; the notes are then
+        # inserted once it has all arrived, and the result is an AsyncResult.
+        # Without audio the notes are inserted right away.
+        if self.collection() is None:
+            return [None] * len(notes)
+
+        urls = set(params.audio.url for params in notes if self.hasAudio(params))
+        if not urls:
+            return self.insertNotes(notes, {})
+
+        return whenReady(self.downloader.fetch(urls), lambda audio: self.insertNotes(notes, audio))
+
+
+    def insertNotes(self, notes, audio):
+        # All notes are added in one editing session: one GUI reset and one
+        # save for the whole list. Each note is checked just before it is
+        # inserted, so duplicates within the list are caught as before.
+        # Entries that are None (failed validation) yield None.
         collection = self.collection()
         if collection is None:
-            return
+            return [None] * len(notes)
 
-        note = self.createNote(params)
-        if note is None:
-            return
+        results = []
+        editing = False
+        try:
+            for params in notes:
+                note = self.createNote(params) if params is not None else None
+                if note is None:
+                    results.append(None)
+                    continue
+
+                if not editing:
+                    self.startEditing()
+                    editing = True
+
+                if self.hasAudio(params):
+                    self.addAudio(note, params, *audio.get(params.audio.url, (None, None)))
+                collection.addNote(note)
+                results.append(note.id)
+        finally:
+            if editing:
+                collection.autosave()
+                self.stopEditing()
 
-        if params.audio is not None and len(params.audio.fields) > 0:
-            data = download(params.audio.url)
-            if data is not None:
-                if params.audio.skipHash is None:
-                    skip = False
-                else:
-                    m = hashlib.md5()
-                    m.update(data)
-                    skip = params.audio.skipHash == m.hexdigest()
+        return results
 
-                if not skip:
-                    audioInject(note, params.audio.fields, params.audio.filename)
-                    self.media().writeData(params.audio.filename, data)
 
-        self.startEditing()
-        collection.addNote(note)
-        collection.autosave()
-        self.stopEditing()
+    def hasAudio(self, params):
+        return params is not None and params.audio is not None and len(params.audio.fields) > 0
+
 
-        return note.id
+    def addAudio(self, note, params, data, digest):
+        if data is not None and params.audio.skipHash != digest:
+            audioInject(note, params.audio.fields, params.audio.filename)
+            self.media().writeData(params.audio.filename, data)
 
 
     def canAddNote(self, note):
@@ -423,7 +1132,9 @@ class AnkiBridge:
             if name in note:
                 note[name] = value
 
-        if not note.dupeOrEmpty():
+        # dupeOrEmpty() is 1 for an empty first field and 2 for a duplicate.
+        problem = note.dupeOrEmpty()
+        if not problem or (problem == 2 and params.allowDuplicate):
             return note
 
     def updateNoteFields(self, params):
@@ -439,9 +1150,59 @@ class AnkiBridge:
                 note[name] = value
         note.flush()
 
+
+    def updateNotesFields(self, notes):
+        # One editing session (a single GUI reset and save) for the whole
+        # list. Each entry yields True when the note exists and now has the
+        # given values, False otherwise; unchanged notes are not rewritten.
+        collection = self.collection()
+        if collection is None:
+            return [False] * len(notes)
+
+        ids = []
+        for params in notes:
+            try:
+                ids.append(int(params['id']))
+            except (KeyError, TypeError, ValueError):
+                ids.append(None)
+
+        existing = set(nid for nid, in self.queryIds(
+            'select id from notes where id in {ids}', [nid for nid in ids if nid is not None]))
+
+        results = []
+        editing = False
+        try:
+            for nid, params in zip(ids, notes):
+                fields = params.get('fields') if nid in existing else None
+                if type(fields) != dict:
+                    results.append(False)
+                    continue
+
+                note = collection.getNote(nid)
+                changed = False
+                for name, value in fields.items():
+                    if name in note and note[name] != value:
+                        note[name] = value
+                        changed = True
+
+                if changed:
+                    if not editing:
+                        self.startEditing()
+                        editing = True
+                    note.flush()
+
+                results.append(True)
+        finally:
+            if editing:
+                collection.autosave()
+                self.stopEditing()
+
+        return results
+
     def addTags(self, notes, tags, add=True):
         self.startEditing()
-        self.collection().tags.bulkAdd(notes, tags, add)
+        for chunk in chunked(notes):
+            self.collection().tags.bulkAdd(chunk, tags, add)
         self.stopEditing()
 
 
@@ -450,70 +1211,96 @@ class AnkiBridge:
 
 
     def suspend(self, cards, suspend=True):
-        for card in cards:
-            isSuspended = self.isSuspended(card)
-            if suspend and isSuspended:
-                cards.remove(card)
-            elif not suspend and not isSuspended:
-                cards.remove(card)
+        queues = dict(self.queryIds('select id, queue from cards where id in {ids}', cards))
+
+        changed = []
+        for cid in cards:
+            if cid in queues and (queues[cid] == -1) != suspend:
+                changed.append(cid)
+                del queues[cid]
 
-        if cards:
+        if changed:
             self.startEditing()
-            if suspend:
-                self.collection().sched.suspendCards(cards)
-            else:
-                self.collection().sched.unsuspendCards(cards)
+            for chunk in chunked(changed):
+                if suspend:
+                    self.collection().sched.suspendCards(chunk)
+                else:
+                    self.collection().sched.unsuspendCards(chunk)
             self.stopEditing()
-            return True
 
-        return False
+        return changed
 
 
     def areSuspended(self, cards):
-        suspended = []
-        for card in cards:
-            card = self.collection().getCard(card)
-            if card.queue == -1:
-                suspended.append(True)
-            else:
-                suspended.append(False)
-        return suspended
+        queues = dict(self.queryIds('select id, queue from cards where id in {ids}', cards))
+
+        # None for ids that don't exist, keeping the result positional.
+        return [queues[cid] == -1 if cid in queues else None for cid in cards]
 
 
     def areDue(self, cards):
-        due = []
-        for card in cards:
-            if self.findCards('cid:%s is:new' % card):
-                due.append(True)
-                continue
+        new = self.cardsMatching(cards, 'is:new')
+        reviewed = [cid for cid in cards if cid not in new]
+        latest = self.latestReviews(reviewed)
 
-            date, ivl = self.collection().db.all('select id/1000.0, ivl from revlog where cid = ?', card)[-1]
-            if (ivl >= -1200):
-                if self.findCards('cid:%s is:due' % card):
-                    due.append(True)
-                else:
-                    due.append(False)
+        # Cards without a review log (e.g. rescheduled by hand) are left to
+        # the scheduler, like those with a day-based interval.
+        scheduled = [cid for cid in reviewed if cid not in latest or latest[cid][1] >= -1200]
+        due = self.cardsMatching(scheduled, 'is:due')
+
+        result = []
+        for cid in cards:
+            if cid in new or cid in due:
+                result.append(True)
+            elif cid in latest and latest[cid][1] < -1200:
+                date, ivl = latest[cid]
+                result.append(date - ivl <= time())
             else:
-                if date - ivl <= time():
-                    due.append(True)
-                else:
-                    due.append(False)
+                result.append(False)
 
-        return due
+        return result
 
 
     def getIntervals(self, cards, complete=False):
-        intervals = []
-        for card in cards:
-            if self.findCards('cid:%s is:new' % card):
-                intervals.append(0)
-                continue
+        new = self.cardsMatching(cards, 'is:new')
+        reviewed = [cid for cid in cards if cid not in new]
+
+        if complete:
+            history = {}
+            for cid, ivl in self.queryIds('select cid, ivl from revlog where cid in {ids} order by id', reviewed):
+                history.setdefault(cid, []).append(ivl)
+            return [0 if cid in new else history.get(cid, []) for cid in cards]
+
+        latest = self.latestReviews(reviewed)
+        return [0 if cid in new or cid not in latest else latest[cid][1] for cid in cards]
+
+
+    def cardsMatching(self, cards, query):
+        # One search per chunk of the list instead of one per card.
+        matching = set()
+        for chunk in chunked(cards):
+            matching.update(self.findCards('cid:{} {}'.format(','.join(str(cid) for cid in chunk), query)))
+        return matching
 
-            interval = self.collection().db.list('select ivl from revlog where cid = ?', card)
-            if not complete:
-                interval = interval[-1]
-            intervals.append(interval)
-        return intervals
+
+    def latestReviews(self, cards):
+        # {cid: (review time in seconds, ivl)} for each card's most recent
+        # revlog entry.
+        rows = self.queryIds(
+            'select r.cid, r.id / 1000.0, r.ivl from revlog r join '
+            '(select cid, max(id) as id from revlog where cid in {ids} group by cid) latest '
+            'on r.id = latest.id', cards)
+        return dict((cid, (date, ivl)) for cid, date, ivl in rows)
+
+
+    def queryIds(self, sql, ids, *args):
+        # Runs a select whose "in {ids}" takes an id list, one chunk of ids at
+        # a time so huge lists stay within SQLite's statement size limit.
+        # Rows are concatenated, so any ordering only holds within a chunk.
+        rows = []
+        for chunk in chunked(ids):
+            rows.extend(self.collection().db.all(sql.format(ids=anki.utils.ids2str(chunk)), *args))
+        return rows
 
 
     def startEditing(self):
@@ -541,13 +1328,6 @@ class AnkiBridge:
         return self.collection().sched
 
 
-    def multi(self, actions):
-        response = []
-        for item in actions:
-            response.append(AnkiConnect.handler(ac, item))
-        return response
-
-
     def media(self):
         collection = self.collection()
         if collection is not None:
@@ -712,83 +1492,132 @@ class AnkiBridge:
         else:
             return []
 
-    def cardsInfo(self,cards):
+    def cardsInfo(self, cards, render=True, css=True):
+        # Fields and scheduling data come from one query; templates are only
+        # rendered when asked for (once per card), and css can be left out or
+        # sent once per model (css='model': only on the first card of each
+        # model) instead of with every card.
+        collection = self.collection()
+
+        rows = {}
+        for row in self.queryIds(
+                'select c.id, c.nid, c.did, c.ord, c.factor, c.ivl, n.mid, n.flds '
+                'from cards c join notes n on n.id = c.nid where c.id in {ids}', cards):
+            rows[row[0]] = row
+
+        models = {}
+        deckNames = {}
+        cssSent = set()
         result = []
         for cid in cards:
-            try:
-                card = self.collection().getCard(cid)
-                model = card.model()
-                note = card.note()
-                fields = {}
-                for info in model['flds']:
-                    order = info['ord']
-                    name = info['name']
-                    fields[name] = {'value': note.fields[order], 'order': order}
-            
-                result.append({
-                    'cardId': card.id,
-                    'fields': fields,
-                    'fieldOrder': card.ord,
-                    'question': card._getQA()['q'],
-                    'answer': card._getQA()['a'],
-                    'modelName': model['name'],
-                    'deckName': self.deckNameFromId(card.did),
-                    'css': model['css'],
-                    'factor': card.factor, 
-                    #This factor is 10 times the ease percentage, 
-                    # so an ease of 310% would be reported as 3100
-                    'interval': card.ivl,
-                    'note': card.nid
-                })
-            except TypeError as e:
-                # Anki will give a TypeError if the card ID does not exist.
-                # Best behavior is probably to add an "empty card" to the
-                # returned result, so that the items of the input and return
-                # lists correspond.
+            row = rows.get(cid)
+            if row is None:
+                # Keep the input and returned lists aligned for missing ids.
                 result.append({})
+                continue
+
+            cid, nid, did, order, factor, interval, mid, flds = row
+            model = models.get(mid)
+            if model is None:
+                model = models[mid] = collection.models.get(mid)
+            if did not in deckNames:
+                deckNames[did] = self.deckNameFromId(did)
+
+            values = anki.utils.splitFields(flds)
+            info = {
+                'cardId': cid,
+                'fields': dict((f['name'], {'value': values[f['ord']], 'order': f['ord']}) for f in model['flds']),
+                'fieldOrder': order,
+                'modelName': model['name'],
+                'deckName': deckNames[did],
+                'factor': factor,
+                #This factor is 10 times the ease percentage,
+                # so an ease of 310% would be reported as 3100
+                'interval': interval,
+                'note': nid
+            }
+
+            if render:
+                qa = collection.getCard(cid)._getQA()
+                info['question'] = qa['q']
+                info['answer'] = qa['a']
+
+            if css is True or (css == 'model' and mid not in cssSent):
+                info['css'] = model['css']
+                cssSent.add(mid)
+
+            result.append(info)
 
         return result
 
     def notesInfo(self,notes):
+        # Three set-based queries instead of getNote() plus a cards query per
+        # note; model field definitions are looked up once per model.
+        collection = self.collection()
+
+        rows = {}
+        for nid, mid, mod, tags, flds in self.queryIds(
+                'select id, mid, mod, tags, flds from notes where id in {ids}', notes):
+            rows[nid] = (mid, mod, tags, flds)
+
+        cards = {}
+        for nid, cid in self.queryIds('select nid, id from cards where nid in {ids} order by nid, ord', notes):
+            cards.setdefault(nid, []).append(cid)
+
+        models = {}
         result = []
         for nid in notes:
-            try:
-                note = self.collection().getNote(nid)
-                model = note.model()
-
-                fields = {}
-                for info in model['flds']:
-                    order = info['ord']
-                    name = info['name']
-                    fields[name] = {'value': note.fields[order], 'order': order}
-            
-                result.append({
-                    'noteId': note.id,
-                    'tags' : note.tags,
-                    'fields': fields,
-                    'modelName': model['name'],
-                    'cards': self.collection().db.list(
-                        "select id from cards where nid = ? order by ord", note.id)
-                })
-            except TypeError as e:
-                # Anki will give a TypeError if the note ID does not exist.
-                # Best behavior is probably to add an "empty card" to the
-                # returned result, so that the items of the input and return
-                # lists correspond.
+            row = rows.get(nid)
+            if row is None:
+                # Keep the input and returned lists aligned for missing ids.
+                result.append({})
+                continue
+
+            mid, mod, tags, flds = row
+            model = models.get(mid)
+            if model is None:
+                info = collection.models.get(mid)
+                model = models[mid] = (info['name'], [(f['name'], f['ord']) for f in info['flds']])
+
+            values = anki.utils.splitFields(flds)
+            result.append({
+                'noteId': nid,
+                'tags' : collection.tags.split(tags),
+                'fields': dict((name, {'value': values[order], 'order': order}) for name, order in model[1]),
+                'modelName': model[0],
+                'mod': mod,
+                'cards': cards.get(nid, [])
+            })
+
+        return result
+
+
+    def notesModTime(self, notes):
+        mods = dict(self.queryIds('select id, mod from notes where id in {ids}', notes))
+
+        result = []
+        for nid in notes:
+            if nid in mods:
+                result.append({'noteId': nid, 'mod': mods[nid]})
+            else:
                 result.append({})
         return result
 
 
     def getDecks(self, cards):
+        # Deck ids for all cards come from one query per chunk, and each
+        # distinct deck is looked up once. Unknown card ids are skipped.
+        dids = dict(self.queryIds('select id, did from cards where id in {ids}', cards))
+
+        names = {}
         decks = {}
         for card in cards:
-            did = self.collection().db.scalar('select did from cards where id = ?', card)
-            deck = self.collection().decks.get(did)['name']
-
-            if deck in decks:
-                decks[deck].append(card)
-            else:
-                decks[deck] = [card]
+            did = dids.get(card)
+            if did is None:
+                continue
+            if did not in names:
+                names[did] = self.collection().decks.get(did)['name']
+            decks.setdefault(names[did], []).append(card)
 
         return decks
 
@@ -800,13 +1629,13 @@ class AnkiBridge:
         mod = anki.utils.intTime()
         usn = self.collection().usn()
 
-        # normal cards
-        scids = anki.utils.ids2str(cards)
-        # remove any cards from filtered deck first
-        self.collection().sched.remFromDyn(cards)
+        for chunk in chunked(cards):
+            # remove any cards from filtered deck first
+            self.collection().sched.remFromDyn(chunk)
 
-        # then move into new deck
-        self.collection().db.execute('update cards set usn=?, mod=?, did=? where id in ' + scids, usn, mod, did)
+            # then move into new deck
+            self.collection().db.execute(
+                'update cards set usn=?, mod=?, did=? where id in ' + anki.utils.ids2str(chunk), usn, mod, did)
         self.stopEditing()
 
 
@@ -819,7 +1648,13 @@ class AnkiBridge:
 
 
     def cardsToNotes(self, cards):
-        return self.collection().db.list('select distinct nid from cards where id in ' + anki.utils.ids2str(cards))
+        notes = []
+        seen = set()
+        for nid, in self.queryIds('select distinct nid from cards where id in {ids}', cards):
+            if nid not in seen:
+                seen.add(nid)
+                notes.append(nid)
+        return notes
 
 
     def guiBrowse(self, query=None):
@@ -953,15 +1788,18 @@ class AnkiBridge:
 
 class AnkiConnect:
     def __init__(self):
-        self.anki = AnkiBridge()
-        self.server = AjaxServer(self.handler)
+        self.executor = MainThreadExecutor()
+        self.anki = AnkiBridge(AudioDownloader(self.executor))
+        self.dispatch = self.buildDispatch()
+        self.server = AjaxServer(self.handler, self.executor)
 
         try:
             self.server.listen()
 
-            self.timer = QTimer()
-            self.timer.timeout.connect(self.advance)
-            self.timer.start(TICK_INTERVAL)
+            if not self.server.start():
+                self.timer = QTimer()
+                self.timer.timeout.connect(self.advance)
+                self.timer.start(TICK_INTERVAL)
         except:
             QMessageBox.critical(
                 self.anki.window(),
@@ -974,48 +1812,73 @@ class AnkiConnect:
         self.server.advance()
 
 
-    def handler(self, request):
-        name = request.get('action', '')
-        version = request.get('version', 4)
-        params = request.get('params', {})
-        reply = {'result': None, 'error': None}
+    def buildDispatch(self):
+        # Resolve every (version, action name) pair once, so handler() doesn't
+        # have to reflect over all methods on each request. Aliases only
+        # change at declared versions, so versions above the highest one
+        # share its entries.
+        methods = [
+            (methodName, methodInst)
+            for methodName, methodInst in inspect.getmembers(self, predicate=inspect.ismethod)
+            if getattr(methodInst, 'api', False)
+        ]
 
-        try:
-            method = None
+        self.dispatchVersion = max(
+            [API_VERSION] + [apiVersion for _, methodInst in methods for apiVersion, _ in methodInst.versions]
+        )
 
-            for methodName, methodInst in inspect.getmembers(self, predicate=inspect.ismethod):
+        dispatch = {}
+        for version in range(self.dispatchVersion + 1):
+            for methodName, methodInst in methods:
                 apiVersionLast = 0
                 apiNameLast = None
 
-                if getattr(methodInst, 'api', False):
-                    for apiVersion, apiName in getattr(methodInst, 'versions', []):
-                        if apiVersionLast < apiVersion <= version:
-                            apiVersionLast = apiVersion
-                            apiNameLast = apiName
+                for apiVersion, apiName in methodInst.versions:
+                    if apiVersionLast < apiVersion <= version:
+                        apiVersionLast = apiVersion
+                        apiNameLast = apiName
+
+                if apiNameLast is None and apiVersionLast == 0:
+                    apiNameLast = methodName
 
-                    if apiNameLast is None and apiVersionLast == 0:
-                        apiNameLast = methodName
+                dispatch.setdefault((version, apiNameLast), methodInst)
 
-                    if apiNameLast is not None and apiNameLast == name:
-                        method = methodInst
-                        break
+        return dispatch
 
+
+    def handler(self, request):
+        name = request.get('action', '')
+        version = request.get('version', 4)
+        params = request.get('params', {})
+
+        try:
+            method = self.dispatch.get((min(max(version, 0), self.dispatchVersion), name))
             if method is None:
                 raise Exception('unsupported action')
             else:
-                reply['result'] = methodInst(**params)
+                result = method(**params)
         except Exception as e:
-            reply['error'] = str(e)
+            return self.reply(None, e, version)
 
-        if version > 4:
+        if isinstance(result, AsyncResult):
+            # The reply is only known once the result resolves.
+            reply = AsyncResult()
+            result.then(lambda value, error: reply.resolve(self.reply(value, error, version)))
             return reply
+
+        return self.reply(result, None, version)
+
+
+    def reply(self, result, error, version):
+        if version > 4:
+            return {'result': result, 'error': None if error is None else str(error)}
         else:
-            return reply['result']
+            return result
 
 
     @webApi()
     def multi(self, actions):
-        return self.anki.multi(actions)
+        return AsyncResult.gather([self.handler(item) for item in actions])
 
 
     @webApi()
@@ -1097,20 +1960,22 @@ class AnkiConnect:
 
     @webApi()
     def addNotes(self, notes):
-        results = []
+        params = []
         for note in notes:
-            params = AnkiNoteParams(note)
-            if params.validate():
-                results.append(self.anki.addNote(params))
-            else:
-                results.append(None)
+            note = AnkiNoteParams(note)
+            params.append(note if note.validate() else None)
 
-        return results
+        return self.anki.addNotes(params)
 
     @webApi()
     def updateNoteFields(self, note):
         return self.anki.updateNoteFields(note)
 
+
+    @webApi()
+    def updateNotesFields(self, notes):
+        return self.anki.updateNotesFields(notes)
+
     @webApi()
     def canAddNotes(self, notes):
         results = []
@@ -1274,13 +2139,17 @@ class AnkiConnect:
         return self.anki.guiExitAnki()
 
     @webApi()
-    def cardsInfo(self, cards):
-        return self.anki.cardsInfo(cards)
+    def cardsInfo(self, cards, render=True, css=True):
+        return self.anki.cardsInfo(cards, render, css)
 
     @webApi()
     def notesInfo(self, notes):
         return self.anki.notesInfo(notes)
 
+    @webApi()
+    def notesModTime(self, notes):
+        return self.anki.notesModTime(notes)
+
 #
 #   Entry
 #
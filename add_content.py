@@ -14,7 +14,7 @@ Covers:
 Run with Anki open.
 """
 
-from anki_client import find_notes, get_notes_info, invoke, add_note
+from anki_client import find_notes, get_notes_info, invoke, add_note, batch
 
 BASIC1 = "cpnl basic 1 [dev]"
 BASIC2_SRC = "cpnl bàsic 2"
@@ -29,7 +29,7 @@ VERBS  = "Verbs Essencials"
 def load_deck_index(deck: str) -> dict:
     """Returns {stripped_front: note} for every note in the deck."""
     note_ids = find_notes(f'deck:"{deck}"')
-    notes = get_notes_info(note_ids)
+    notes = get_notes_info(note_ids, cached=True)
     return {n["fields"]["Front"]["value"].strip(): n for n in notes if n}
 
 
@@ -281,8 +281,10 @@ def add_basic2_content():
 # Main
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
-    fix_verb_deck()
-    add_new_verbs()
-    add_basic1_vocab()
-    add_basic2_content()
+    # Field/tag updates are sent in `multi` batches instead of one call each
+    with batch():
+        fix_verb_deck()
+        add_new_verbs()
+        add_basic1_vocab()
+        add_basic2_content()
     print("\n🎉 All content added/updated!")
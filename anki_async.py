@@ -0,0 +1,203 @@
+"""
+anki_async.py
+-------------
+asyncio counterpart of anki_client.py, built on raw asyncio streams so it
+stays stdlib-only. Requests share a small set of keep-alive connections and
+at most `max_in_flight` of them run at once, so work across several decks can
+be pipelined instead of run strictly one after another.
+
+The endpoint defaults to anki_client's current one (see anki_client.set_url).
+When anki_client has a record/replay transport installed (ANKI_RECORD /
+ANKI_REPLAY), requests go through it on worker threads instead, so async
+scripts can be recorded and replayed too.
+
+Usage:
+    async with AsyncAnkiClient(max_in_flight=4) as anki:
+        ids = await anki.find_notes('deck:"Verbs Essencials"')
+        notes = await anki.get_notes_info(ids)
+"""
+
+import asyncio
+import json
+import time
+import urllib.parse
+
+import anki_client
+import anki_metrics
+from anki_client import DEFAULT_TIMEOUT, _format_notes, _unwrap, decode_body
+
+
+class AsyncAnkiClient:
+    """
+    Async AnkiConnect client with bounded concurrency.
+
+    Args:
+        url:            AnkiConnect endpoint (default: anki_client's current one)
+        max_in_flight:  Maximum number of requests awaiting a reply at once
+        timeout:        Per-request timeout in seconds
+    """
+
+    def __init__(self, url: str = None, max_in_flight: int = 4, timeout: float = DEFAULT_TIMEOUT):
+        # Without an explicit url, a record/replay transport installed in
+        # anki_client is used instead of a direct connection.
+        self._transport = None
+        if url is None:
+            url = anki_client.ANKI_CONNECT_URL
+            if not isinstance(anki_client._transport, anki_client.ConnectionPool):
+                self._transport = anki_client._transport
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 80
+        self.path = parsed.path or "/"
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._idle = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Close every idle connection."""
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+    # -----------------------------------------------------------------------
+    # Transport
+    # -----------------------------------------------------------------------
+
+    async def _roundtrip(self, reader, writer, body: bytes) -> tuple[bytes, bool]:
+        head = (
+            f"POST {self.path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            "Accept-Encoding: gzip, deflate\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode("latin-1")
+        writer.write(head + body)
+        await writer.drain()
+
+        raw = await reader.readuntil(b"\r\n\r\n")
+        lines = raw.decode("latin-1").split("\r\n")
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close" and lines[0].startswith("HTTP/1.1")
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            data = bytearray()
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readuntil(b"\r\n")
+                    break
+                data += await reader.readexactly(size)
+                await reader.readexactly(2)
+            data = bytes(data)
+        elif "content-length" in headers:
+            data = await reader.readexactly(int(headers["content-length"]))
+        else:
+            # No framing: the body runs until the server closes the socket.
+            data = await reader.read()
+            keep_alive = False
+
+        encoding = headers.get("content-encoding", "").lower()
+        if encoding in ("gzip", "deflate"):
+            data = decode_body(data, encoding)
+        return data, keep_alive
+
+    async def _request(self, body: bytes) -> bytes:
+        async with self._slots:
+            if self._transport is not None:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, self._transport.request, body, self.timeout)
+
+            while True:
+                if self._idle:
+                    reader, writer = self._idle.pop()
+                    reused = True
+                else:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout)
+                    reused = False
+
+                try:
+                    data, keep_alive = await asyncio.wait_for(
+                        self._roundtrip(reader, writer, body), self.timeout)
+                except asyncio.TimeoutError:
+                    # The server may still be working on it; never resend.
+                    writer.close()
+                    raise
+                except (asyncio.IncompleteReadError, OSError):
+                    writer.close()
+                    if reused:
+                        continue
+                    raise
+
+                if keep_alive:
+                    self._idle.append((reader, writer))
+                else:
+                    writer.close()
+                return data
+
+    async def invoke(self, action: str, **params):
+        """
+        Send a request to the AnkiConnect API.
+
+        Returns:
+            The result from AnkiConnect, or raises an exception on error.
+        """
+        payload = json.dumps({
+            "action": action,
+            "version": 6,
+            "params": params
+        }).encode("utf-8")
+
+        started = time.perf_counter()
+        try:
+            data = await self._request(payload)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError) as e:
+            if anki_metrics.enabled:
+                anki_metrics.metrics.observe(action, time.perf_counter() - started, len(payload), 0, True)
+            raise ConnectionError(
+                "Could not connect to AnkiConnect. "
+                "Make sure Anki is running and the AnkiConnect add-on (code: 2055492159) is installed.\n"
+                f"Original error: {e!r}"
+            )
+
+        reply = json.loads(data.decode("utf-8"))
+        if anki_metrics.enabled:
+            anki_metrics.metrics.observe(action, time.perf_counter() - started, len(payload), len(data),
+                                         reply.get("error") is not None)
+        return _unwrap(reply)
+
+    # -----------------------------------------------------------------------
+    # Note helpers
+    # -----------------------------------------------------------------------
+
+    async def find_notes(self, query: str) -> list[int]:
+        """Find notes by Anki search query."""
+        return await self.invoke("findNotes", query=query)
+
+    async def get_notes_info(self, note_ids: list[int]) -> list[dict]:
+        """Return full info for a list of note IDs."""
+        return await self.invoke("notesInfo", notes=note_ids)
+
+    async def add_notes(self, notes: list[dict], allow_duplicates: bool = False) -> list[int]:
+        """Add multiple notes at once (same note format as anki_client.add_notes)."""
+        return await self.invoke("addNotes", notes=_format_notes(notes, allow_duplicates))
+
+    async def get_deck_notes(self, deck: str) -> list[dict]:
+        """find_notes + get_notes_info for a whole deck."""
+        return await self.get_notes_info(await self.find_notes(f'deck:"{deck}"'))
@@ -7,47 +7,554 @@ Requires Anki desktop to be running with the AnkiConnect add-on installed.
 AnkiConnect add-on code: 2055492159
 """
 
+import http.client
 import json
-import urllib.request
-import urllib.error
+import os
+import threading
+import time
+import urllib.parse
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+import anki_metrics
+import anki_transport
 
 
 ANKI_CONNECT_URL = "http://localhost:8765"
+DEFAULT_TIMEOUT = 5
+COMPRESS_MIN_SIZE = 1024
+NOTE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".anki_cache", "notes.json")
 
 
-def invoke(action: str, **params):
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+
+class ConnectionPool:
     """
-    Send a request to the AnkiConnect API.
+    A small pool of persistent (HTTP/1.1 keep-alive) connections.
 
-    Args:
-        action: The AnkiConnect action name (e.g. 'deckNames', 'findNotes')
-        **params: Parameters for the action
+    Connections are handed out one per in-flight request and returned to the
+    pool afterwards, so consecutive calls reuse the same TCP socket instead of
+    paying for a new handshake every time.
 
-    Returns:
-        The result from AnkiConnect, or raises an exception on error.
+    With `compress` the pool advertises gzip/deflate in Accept-Encoding and
+    decodes compressed replies. Request bodies of at least COMPRESS_MIN_SIZE
+    bytes are gzipped too, but only once the server has proven it speaks
+    gzip by compressing a reply (older add-on versions can't decode them).
+    """
+
+    def __init__(self, url: str = ANKI_CONNECT_URL, max_size: int = 4, compress: bool = True):
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 80
+        self.path = parsed.path or "/"
+        self.max_size = max_size
+        self.compress = compress
+        self.server_decodes = False
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout: float) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                conn = self._idle.pop()
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                return conn, True
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout), False
+
+    def _release(self, conn: http.client.HTTPConnection):
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def request(self, body: bytes, timeout: float = DEFAULT_TIMEOUT) -> bytes:
+        """
+        POST `body` and return the raw response body.
+
+        A reused connection may have been dropped by the server while idle;
+        in that case the request is retried once on a fresh connection.
+        """
+        headers = {"Content-Type": "application/json"}
+        if self.compress:
+            headers["Accept-Encoding"] = "gzip, deflate"
+            if self.server_decodes and len(body) >= COMPRESS_MIN_SIZE:
+                body = encode_body(body, "gzip")
+                headers["Content-Encoding"] = "gzip"
+
+        while True:
+            conn, reused = self._acquire(timeout)
+            try:
+                conn.request("POST", self.path, body, headers)
+                response = conn.getresponse()
+                data = response.read()
+            except TimeoutError:
+                # The server may still be working on it; never resend.
+                conn.close()
+                raise
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                if reused:
+                    continue
+                raise
+
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+
+            encoding = (response.getheader("Content-Encoding") or "").strip().lower()
+            if encoding in ("gzip", "deflate"):
+                self.server_decodes = True
+                data = decode_body(data, encoding)
+            return data
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def encode_body(data: bytes, encoding: str) -> bytes:
+    """Compress `data` for the given Content-Encoding (gzip or deflate)."""
+    if encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    return zlib.compress(data, 6)
+
+
+def decode_body(data: bytes, encoding: str) -> bytes:
+    """Decompress a body sent with the given Content-Encoding."""
+    if encoding == "gzip":
+        return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    return zlib.decompress(data)
+
+
+_transport = ConnectionPool()
+
+# Actions the current endpoint answered with "unsupported action" (the stock
+# AnkiWeb add-on lacks the bulk actions added in this repo's AnkiConnect.py),
+# and those it is known to answer.
+_unsupported = set()
+_supported = set()
+
+
+def set_url(url: str):
     """
+    Point the client at a different AnkiConnect endpoint.
+
+    A recording transport (ANKI_RECORD) keeps recording, now against the new
+    endpoint; a replay transport is kept as it is.
+    """
+    global ANKI_CONNECT_URL
+    ANKI_CONNECT_URL = url
+    if isinstance(_transport, anki_transport.ReplayTransport):
+        _unsupported.clear()
+        _supported.clear()
+    elif isinstance(_transport, anki_transport.RecordingTransport):
+        set_transport(anki_transport.RecordingTransport(ConnectionPool(url), _transport.path))
+    else:
+        set_transport(ConnectionPool(url))
+
+
+def set_transport(transport):
+    """
+    Replace the object requests are sent through.
+
+    A transport has `request(payload: bytes, timeout: float) -> bytes` and
+    `close()`; see anki_transport.py for the record/replay transports.
+    """
+    global _transport
+    _transport.close()
+    _transport = transport
+    _unsupported.clear()
+    _supported.clear()
+
+
+def _install_transport_from_env():
+    record = os.environ.get("ANKI_RECORD")
+    replay = os.environ.get("ANKI_REPLAY")
+    if replay:
+        set_transport(anki_transport.ReplayTransport(replay))
+    elif record:
+        set_transport(anki_transport.RecordingTransport(_transport, record))
+
+
+_install_transport_from_env()
+
+
+def _send(action: str, params: dict, timeout: float = DEFAULT_TIMEOUT):
+    """POST a single action and return the decoded reply envelope."""
     payload = json.dumps({
         "action": action,
         "version": 6,
         "params": params
     }).encode("utf-8")
 
-    request = urllib.request.Request(ANKI_CONNECT_URL, payload)
+    started = time.perf_counter()
     try:
-        response = urllib.request.urlopen(request, timeout=5)
-    except urllib.error.URLError as e:
+        data = _transport.request(payload, timeout=timeout)
+    except (http.client.HTTPException, OSError) as e:
+        if anki_metrics.enabled:
+            anki_metrics.metrics.observe(action, time.perf_counter() - started, len(payload), 0, True)
         raise ConnectionError(
             "Could not connect to AnkiConnect. "
             "Make sure Anki is running and the AnkiConnect add-on (code: 2055492159) is installed.\n"
             f"Original error: {e}"
-        )
+        ) from e
+
+    reply = json.loads(data.decode("utf-8"))
+    if anki_metrics.enabled:
+        anki_metrics.metrics.observe(action, time.perf_counter() - started, len(payload), len(data),
+                                     reply.get("error") is not None)
+    return reply
+
 
-    result = json.loads(response.read().decode("utf-8"))
+def _unwrap(reply: dict):
+    if reply.get("error") is not None:
+        raise Exception(f"AnkiConnect error: {reply['error']}")
+    return reply["result"]
 
-    if result.get("error") is not None:
-        raise Exception(f"AnkiConnect error: {result['error']}")
 
-    return result["result"]
+def invoke(action: str, **params):
+    """
+    Send a request to the AnkiConnect API.
+
+    Inside a `batch()` block, mutating actions (see BATCHABLE_ACTIONS) are
+    queued and a Future is returned instead; any other action first flushes
+    the queue so reads always observe earlier writes.
+
+    Args:
+        action: The AnkiConnect action name (e.g. 'deckNames', 'findNotes')
+        **params: Parameters for the action
+
+    Returns:
+        The result from AnkiConnect, or raises an exception on error.
+    """
+    active = getattr(_batch_state, "batch", None)
+    if active is not None:
+        if action in BATCHABLE_ACTIONS:
+            return active.submit(action, params)
+        active.flush()
+
+    return _unwrap(_send(action, params))
+
+
+# ---------------------------------------------------------------------------
+# Request batching
+# ---------------------------------------------------------------------------
+
+# Actions whose result scripts don't need right away, safe to defer.
+BATCHABLE_ACTIONS = {
+    "updateNoteFields",
+    "addTags",
+    "removeTags",
+    "deleteNotes",
+    "changeDeck",
+    "suspend",
+    "unsuspend",
+}
+
+_batch_state = threading.local()
+
+
+class Batch:
+    """
+    Queues mutating calls and sends them as one `multi` request.
+
+    The queue is flushed when it reaches `max_size` calls, when the oldest
+    queued call is more than `max_delay` seconds old, before any
+    non-batchable call, and when the `with` block exits. Consecutive
+    updateNoteFields calls are sent as a single updateNotesFields if the
+    endpoint supports it (checked once, before the first merge), so the
+    calls always run in the order they were queued.
+    """
+
+    def __init__(self, max_size: int = 50, max_delay: float = 1.0, raise_errors: bool = True):
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.raise_errors = raise_errors
+        self._pending = []
+        self._oldest = None
+        self._errors = []
+
+    def submit(self, action: str, params: dict) -> Future:
+        """Queue one call and return a Future for its result."""
+        future = Future()
+        if not self._pending:
+            self._oldest = time.monotonic()
+        self._pending.append((action, params, future))
+
+        if len(self._pending) >= self.max_size or time.monotonic() - self._oldest >= self.max_delay:
+            self.flush()
+        return future
+
+    def flush(self):
+        """Send every queued call and resolve their futures."""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            groups = _coalesce(pending)
+        except Exception as e:
+            for _, _, future in pending:
+                future.set_exception(e)
+            raise
+        self._send_groups(groups)
+
+    def _send_groups(self, groups: list):
+        actions = [
+            {"action": action, "version": 6, "params": params}
+            for action, params, _ in groups
+        ]
+        try:
+            replies = _unwrap(_send("multi", {"actions": actions}))
+        except Exception as e:
+            for _, _, futures in groups:
+                for future in futures:
+                    future.set_exception(e)
+            raise
+
+        for (action, params, futures), reply in zip(groups, replies):
+            try:
+                result = _unwrap(reply)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                self._errors.append(f"{action}: {e}")
+                continue
+
+            if action != "updateNotesFields":
+                futures[0].set_result(result)
+                continue
+
+            for note, future, ok in zip(params["notes"], futures, result):
+                if ok:
+                    future.set_result(None)
+                else:
+                    e = Exception(f"AnkiConnect error: Failed to get note:{note.get('id')}")
+                    future.set_exception(e)
+                    self._errors.append(f"updateNoteFields: {e}")
+
+    def __enter__(self):
+        self._outer = getattr(_batch_state, "batch", None)
+        _batch_state.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _batch_state.batch = self._outer
+        try:
+            self.flush()
+        except Exception:
+            if exc_type is None:
+                raise
+            return False
+
+        if exc_type is None and self.raise_errors and self._errors:
+            raise Exception(f"{len(self._errors)} batched call(s) failed; first: {self._errors[0]}")
+        return False
+
+
+def _coalesce(pending: list) -> list:
+    """
+    Merge runs of consecutive updateNoteFields calls into one updateNotesFields
+    call, so they are applied in one collection transaction, unless the
+    endpoint lacks updateNotesFields. Returns (action, params, futures)
+    groups in the original order.
+    """
+    groups = []
+    for action, params, future in pending:
+        if action != "updateNoteFields" or not _supports("updateNotesFields", notes=[]):
+            groups.append((action, params, [future]))
+        elif groups and groups[-1][0] == "updateNotesFields":
+            groups[-1][1]["notes"].append(params["note"])
+            groups[-1][2].append(future)
+        else:
+            groups.append(("updateNotesFields", {"notes": [params["note"]]}, [future]))
+    return groups
+
+
+def _supports(action: str, **params) -> bool:
+    """
+    Whether the current endpoint has `action`. Asked once per endpoint with
+    a harmless `params` (e.g. an empty list) and remembered.
+    """
+    if action in _supported:
+        return True
+    if action in _unsupported:
+        return False
+
+    error = _send(action, params).get("error")
+    if error is not None and "unsupported action" in str(error):
+        _unsupported.add(action)
+        return False
+    _supported.add(action)
+    return True
+
+
+def _flush_batch():
+    """Send the calling thread's queued batch, if any, so a read sees it."""
+    active = getattr(_batch_state, "batch", None)
+    if active is not None:
+        active.flush()
+
+
+def batch(max_size: int = 50, max_delay: float = 1.0, raise_errors: bool = True) -> Batch:
+    """
+    Group mutating calls into `multi` requests.
+
+    Usage:
+        with batch():
+            invoke("updateNoteFields", note={...})   # returns a Future
+            invoke("addTags", notes=[nid], tags="casa")
+    """
+    return Batch(max_size, max_delay, raise_errors)
+
+
+# ---------------------------------------------------------------------------
+# Adaptive batching
+# ---------------------------------------------------------------------------
+
+# Actions taking a list parameter whose result is a list aligned with it,
+# so the request can be split into sub-batches and the results concatenated.
+SPLITTABLE_PARAMS = {
+    "addNotes": "notes",
+    "canAddNotes": "notes",
+    "notesInfo": "notes",
+    "notesModTime": "notes",
+    "updateNotesFields": "notes",
+    "cardsInfo": "cards",
+    "areSuspended": "cards",
+    "areDue": "cards",
+    "getIntervals": "cards",
+}
+
+# Actions that are safe to resend after a timeout (Anki may still be working
+# on the first attempt, so anything that writes must not be sent twice).
+IDEMPOTENT_ACTIONS = {
+    "canAddNotes", "notesInfo", "notesModTime", "cardsInfo",
+    "areSuspended", "areDue", "getIntervals",
+}
+
+
+class AdaptiveController:
+    """
+    Sizes sub-batches and their timeouts from observed latency (AIMD).
+
+    The batch size grows by `step` after every sub-batch that finishes within
+    `target_latency` and is halved after a slow or failed one. Timeouts are
+    `safety` times the expected duration of a sub-batch (per-item latency is
+    tracked as a moving average), clamped to [min_timeout, max_timeout]. Until
+    the first measurement the generous `max_timeout` is used.
+    """
+
+    def __init__(self, initial_size: int = 50, min_size: int = 1, max_size: int = 1000, step: int = 10,
+                 target_latency: float = 2.0, safety: float = 4.0,
+                 min_timeout: float = DEFAULT_TIMEOUT, max_timeout: float = 120.0):
+        self.size = initial_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.step = step
+        self.target_latency = target_latency
+        self.safety = safety
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.per_item = None
+
+    def timeout_for(self, count: int) -> float:
+        if self.per_item is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.safety * self.per_item * count))
+
+    def record(self, count: int, elapsed: float):
+        """Feed back a successful sub-batch of `count` items."""
+        sample = elapsed / max(count, 1)
+        self.per_item = sample if self.per_item is None else 0.7 * self.per_item + 0.3 * sample
+        if elapsed <= self.target_latency:
+            self.size = min(self.max_size, self.size + self.step)
+        else:
+            self.backoff()
+
+    def backoff(self, count: int = 0, timeout: float = None):
+        """Halve the batch size; after a timeout also raise the latency estimate."""
+        self.size = max(self.min_size, self.size // 2)
+        if timeout is not None and count:
+            # It took at least `timeout` seconds, so the estimate was too low.
+            self.per_item = max(self.per_item or 0.0, timeout / count)
+
+
+# One controller per action: sizes and latencies learned from cheap reads
+# must not be used to size expensive writes such as addNotes.
+_adaptive = {}
+_adaptive_lock = threading.Lock()
+
+
+def _controller_for(action: str) -> AdaptiveController:
+    with _adaptive_lock:
+        if action not in _adaptive:
+            _adaptive[action] = AdaptiveController()
+        return _adaptive[action]
+
+
+def _retriable(error: ConnectionError, action: str) -> bool:
+    if action in IDEMPOTENT_ACTIONS:
+        return True
+    # Refused before anything was sent: the action certainly didn't run.
+    return isinstance(error.__cause__, ConnectionRefusedError)
+
+
+def invoke_adaptive(action: str, retries: int = 3, controller: AdaptiveController = None, **params):
+    """
+    Like invoke(), but splits large list parameters into adaptive sub-batches.
+
+    Only actions in SPLITTABLE_PARAMS are split. Each action has its own
+    AdaptiveController unless `controller` is given. A sub-batch that fails with a
+    connection error or timeout is retried (up to `retries` times) at a
+    smaller size; sub-batches that already succeeded are never resent. Writes
+    are not retried after a timeout, since Anki may have applied them anyway.
+    """
+    key = SPLITTABLE_PARAMS.get(action)
+    items = params.get(key) if key else None
+    if not isinstance(items, list):
+        return invoke(action, **params)
+
+    _flush_batch()
+
+    controller = controller or _controller_for(action)
+    results = []
+    pos = 0
+    attempts = 0
+    while pos < len(items):
+        chunk = items[pos:pos + controller.size]
+        timeout = controller.timeout_for(len(chunk))
+        started = time.monotonic()
+        try:
+            reply = _send(action, {**params, key: chunk}, timeout=timeout)
+        except ConnectionError as e:
+            if isinstance(e.__cause__, TimeoutError):
+                controller.backoff(len(chunk), timeout)
+            else:
+                controller.backoff()
+            attempts += 1
+            if attempts > retries or not _retriable(e, action):
+                raise ConnectionError(
+                    f"{action} failed after {pos} of {len(items)} item(s) succeeded: {e}") from e.__cause__
+            continue
+
+        result = _unwrap(reply)
+        controller.record(len(chunk), time.monotonic() - started)
+        results.extend(result)
+        pos += len(chunk)
+        attempts = 0
+
+    return results
 
 
 # ---------------------------------------------------------------------------
@@ -76,11 +583,111 @@ def find_notes(query: str) -> list[int]:
     return invoke("findNotes", query=query)
 
 
-def get_notes_info(note_ids: list[int]) -> list[dict]:
-    """Return full info for a list of note IDs."""
+def get_notes_info(note_ids: list[int], cached: bool = False) -> list[dict]:
+    """
+    Return full info for a list of note IDs.
+
+    With `cached=True` unchanged notes are served from the on-disk NoteCache
+    and only new or modified notes are fetched from Anki.
+    """
+    if cached:
+        return note_cache().get_notes_info(note_ids)
     return invoke("notesInfo", notes=note_ids)
 
 
+def get_cards_info(card_ids: list[int], render: bool = True, css=True) -> list[dict]:
+    """
+    Return info for a list of card IDs.
+
+    `render=False` skips the question/answer HTML. `css=False` leaves out the
+    note type css; `css="model"` includes it only on the first card of each
+    note type. Both make bulk reads of fields and scheduling data much cheaper.
+    The options are only sent when they differ from the defaults, since the
+    stock add-on's cardsInfo rejects them.
+    """
+    options = {}
+    if render is not True:
+        options["render"] = render
+    if css is not True:
+        options["css"] = css
+    cards = invoke_adaptive("cardsInfo", cards=card_ids, **options)
+
+    if css == "model":
+        # Each sub-batch sends css for its own first card of a note type;
+        # keep only the first one overall.
+        seen = set()
+        for card in cards:
+            if "css" in card:
+                if card["modelName"] in seen:
+                    del card["css"]
+                else:
+                    seen.add(card["modelName"])
+    return cards
+
+
+def iter_notes(query: str, chunk_size: int = 100, prefetch: bool = True) -> Iterator[dict]:
+    """
+    Yield the notes matching `query` one at a time, fetched in chunks.
+
+    Only `chunk_size` notes are requested per notesInfo call. With `prefetch`
+    the next chunk is fetched on a worker thread while the caller processes
+    the current one, so at most two chunks are held in memory. Notes deleted
+    between the search and the fetch are skipped.
+
+    Inside `batch()`, queued writes are flushed before each chunk is
+    requested (the worker thread doesn't see the caller's batch). A
+    prefetched chunk is requested before the caller has processed the
+    previous one, so use `prefetch=False` when writes made for one chunk
+    must be visible in the next.
+    """
+    note_ids = find_notes(query)
+    chunks = [note_ids[i:i + chunk_size] for i in range(0, len(note_ids), chunk_size)]
+    if not chunks:
+        return
+
+    if not prefetch:
+        for chunk in chunks:
+            yield from (note for note in get_notes_info(chunk) if note)
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        _flush_batch()
+        pending = pool.submit(get_notes_info, chunks[0])
+        for i in range(len(chunks)):
+            notes = pending.result()
+            if i + 1 < len(chunks):
+                _flush_batch()
+                pending = pool.submit(get_notes_info, chunks[i + 1])
+            yield from (note for note in notes if note)
+            del notes
+
+
+def update_notes_fields(updates: list[dict]) -> list[bool]:
+    """
+    Update the fields of many notes in one collection transaction.
+
+    Args:
+        updates: List of {"id": note_id, "fields": {name: value}}
+
+    Returns:
+        One bool per update: False if the note doesn't exist.
+
+    Against an add-on without updateNotesFields the updates are sent as
+    individual updateNoteFields calls in one `multi` request instead.
+    """
+    if "updateNotesFields" not in _unsupported:
+        try:
+            return invoke_adaptive("updateNotesFields", notes=updates)
+        except Exception as e:
+            if "unsupported action" not in str(e):
+                raise
+            _unsupported.add("updateNotesFields")
+
+    actions = [{"action": "updateNoteFields", "version": 6, "params": {"note": note}} for note in updates]
+    replies = invoke("multi", actions=actions)
+    return [reply.get("error") is None for reply in replies]
+
+
 def add_note(deck_name: str, model_name: str, fields: dict, tags: list[str] = None, allow_duplicate: bool = False) -> int:
     """
     Add a single note to a deck.
@@ -113,7 +720,11 @@ def add_notes(notes: list[dict], allow_duplicates: bool = False) -> list[int]:
     Each item in `notes` should be a dict with keys:
       deckName, modelName, fields, tags
     """
-    formatted = [
+    return invoke_adaptive("addNotes", notes=_format_notes(notes, allow_duplicates))
+
+
+def _format_notes(notes: list[dict], allow_duplicates: bool) -> list[dict]:
+    return [
         {
             "deckName": n["deckName"],
             "modelName": n["modelName"],
@@ -123,7 +734,6 @@ def add_notes(notes: list[dict], allow_duplicates: bool = False) -> list[int]:
         }
         for n in notes
     ]
-    return invoke("addNotes", notes=formatted)
 
 
 def get_model_names() -> list[str]:
@@ -136,6 +746,95 @@ def get_model_field_names(model_name: str) -> list[str]:
     return invoke("modelFieldNames", modelName=model_name)
 
 
+# ---------------------------------------------------------------------------
+# Note cache
+# ---------------------------------------------------------------------------
+
+class NoteCache:
+    """
+    Read-through on-disk cache of notesInfo results, keyed by note id.
+
+    Before returning cached notes it asks Anki for their `mod` timestamps
+    (one cheap `notesModTime` call) and refetches only the notes that are
+    new or whose timestamp changed.
+    """
+
+    def __init__(self, path: str = NOTE_CACHE_PATH):
+        self.path = path
+        self._entries = None
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("url") == ANKI_CONNECT_URL:
+                    self._entries = data["notes"]
+            except (OSError, ValueError, KeyError):
+                pass
+        return self._entries
+
+    def save(self):
+        """Write the cache back to disk."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"url": ANKI_CONNECT_URL, "notes": self._load()}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        """Forget every cached note."""
+        self._entries = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def get_notes_info(self, note_ids: list[int]) -> list[dict]:
+        """Same result as notesInfo (including {} for missing ids)."""
+        try:
+            mods = invoke("notesModTime", notes=note_ids)
+        except Exception as e:
+            if "unsupported action" not in str(e):
+                raise
+            return invoke("notesInfo", notes=note_ids)
+
+        entries = self._load()
+        stale = []
+        for nid, info in zip(note_ids, mods):
+            entry = entries.get(str(nid))
+            # `mod` has one-second resolution, so a note fetched in the same
+            # second it was last modified could change again unnoticed.
+            if info and not (entry and entry["mod"] == info["mod"] and entry["mod"] < entry["fetched"]):
+                stale.append(nid)
+
+        if stale:
+            fetched = int(time.time())
+            current = {info["noteId"]: info["mod"] for info in mods if info}
+            for nid, note in zip(stale, invoke("notesInfo", notes=stale)):
+                if note:
+                    entries[str(nid)] = {"mod": current[nid], "fetched": fetched, "note": note}
+                else:
+                    entries.pop(str(nid), None)
+            self.save()
+
+        result = []
+        for nid, info in zip(note_ids, mods):
+            entry = entries.get(str(nid)) if info else None
+            result.append(entry["note"] if entry else {})
+        return result
+
+
+_note_cache = None
+
+
+def note_cache() -> NoteCache:
+    """Return the shared NoteCache instance."""
+    global _note_cache
+    if _note_cache is None:
+        _note_cache = NoteCache()
+    return _note_cache
+
+
 # ---------------------------------------------------------------------------
 # Connection test
 # ---------------------------------------------------------------------------
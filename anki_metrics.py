@@ -0,0 +1,151 @@
+"""
+anki_metrics.py
+---------------
+Per-action instrumentation for the AnkiConnect clients: a latency histogram,
+request/response byte counts and error counts for every action.
+
+Any script can be profiled without code changes by setting an environment
+variable; the report is written when the process exits:
+
+    ANKI_METRICS=json python fix_content_v2.py
+    ANKI_METRICS=prometheus ANKI_METRICS_FILE=metrics.prom python add_content.py
+
+Without ANKI_METRICS_FILE the report goes to stderr.
+"""
+
+import atexit
+import json
+import os
+import sys
+import threading
+
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+
+
+class ActionStats:
+    """Counters for one action."""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.errors = 0
+
+    def observe(self, seconds: float, request_bytes: int, response_bytes: int, error: bool):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.seconds += seconds
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        self.errors += error
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile."""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS, self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return bound
+        return 0.0
+
+
+class Metrics:
+    """Thread-safe registry of ActionStats keyed by action name."""
+
+    def __init__(self):
+        self.actions = {}
+        self._lock = threading.Lock()
+
+    def observe(self, action: str, seconds: float, request_bytes: int = 0, response_bytes: int = 0, error: bool = False):
+        with self._lock:
+            stats = self.actions.get(action)
+            if stats is None:
+                stats = self.actions[action] = ActionStats()
+            stats.observe(seconds, request_bytes, response_bytes, error)
+
+    def reset(self):
+        with self._lock:
+            self.actions = {}
+
+    def to_json(self) -> str:
+        report = {}
+        with self._lock:
+            for action, s in sorted(self.actions.items()):
+                report[action] = {
+                    "count": s.count,
+                    "errors": s.errors,
+                    "seconds_total": round(s.seconds, 6),
+                    "seconds_mean": round(s.seconds / s.count, 6) if s.count else 0.0,
+                    "p50_le": s.quantile(0.5),
+                    "p95_le": s.quantile(0.95),
+                    "request_bytes": s.request_bytes,
+                    "response_bytes": s.response_bytes,
+                    "buckets": {_le(b): n for b, n in zip(BUCKETS, s.buckets)},
+                }
+        return json.dumps(report, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP anki_client_request_seconds AnkiConnect request latency by action.",
+            "# TYPE anki_client_request_seconds histogram",
+        ]
+        with self._lock:
+            items = sorted(self.actions.items())
+            for action, s in items:
+                cumulative = 0
+                for bound, n in zip(BUCKETS, s.buckets):
+                    cumulative += n
+                    lines.append(f'anki_client_request_seconds_bucket{{action="{action}",le="{_le(bound)}"}} {cumulative}')
+                lines.append(f'anki_client_request_seconds_sum{{action="{action}"}} {s.seconds:.6f}')
+                lines.append(f'anki_client_request_seconds_count{{action="{action}"}} {s.count}')
+
+            for name, attr, help_text in (
+                ("anki_client_request_bytes_total", "request_bytes", "JSON bytes sent, by action."),
+                ("anki_client_response_bytes_total", "response_bytes", "JSON bytes received, by action."),
+                ("anki_client_errors_total", "errors", "Failed requests (connection or AnkiConnect error), by action."),
+            ):
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} counter")
+                for action, s in items:
+                    lines.append(f'{name}{{action="{action}"}} {getattr(s, attr)}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, fmt: str = "json", path: str = None):
+        """Write the report as `json` or `prometheus` text to `path` (or stderr)."""
+        text = self.to_prometheus() if fmt == "prometheus" else self.to_json() + "\n"
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        else:
+            sys.stderr.write(text)
+
+
+def _le(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+metrics = Metrics()
+enabled = False
+
+
+def install_from_env():
+    """Turn on recording and the exit-time dump if ANKI_METRICS is set."""
+    global enabled
+    fmt = os.environ.get("ANKI_METRICS", "").strip().lower()
+    if not fmt or enabled:
+        return
+    if fmt not in ("json", "prometheus"):
+        fmt = "json"
+    enabled = True
+    atexit.register(metrics.dump, fmt, os.environ.get("ANKI_METRICS_FILE") or None)
+
+
+install_from_env()
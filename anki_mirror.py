@@ -0,0 +1,232 @@
+"""
+anki_mirror.py
+--------------
+Offline SQLite replica of the decks we manage, built from notesInfo payloads.
+
+`sync` pulls only the notes that were added, changed (different `mod`) or
+deleted since the last run. Read-only tools can then query the mirror
+without Anki being open, through the same function names as anki_client:
+
+    from anki_mirror import Mirror
+    api = Mirror()
+    notes = api.get_notes_info(api.find_notes('deck:"Verbs Essencials"'))
+
+Usage:
+    python anki_mirror.py sync [deck ...]
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+
+import anki_client
+
+
+MIRROR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".anki_cache", "mirror.sqlite3")
+
+DECKS = [
+    "cpnl basic 1",
+    "cpnl basic 1 [dev]",
+    "cpnl bàsic 2 [dev]",
+    "Verbs Essencials",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    id      INTEGER PRIMARY KEY,
+    model   TEXT NOT NULL,
+    mod     INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fields (
+    note_id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+    name    TEXT NOT NULL,
+    ord     INTEGER NOT NULL,
+    value   TEXT NOT NULL,
+    PRIMARY KEY (note_id, name)
+);
+CREATE TABLE IF NOT EXISTS tags (
+    note_id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+    tag     TEXT NOT NULL,
+    PRIMARY KEY (note_id, tag)
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id      INTEGER PRIMARY KEY,
+    note_id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+    ord     INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deck_notes (
+    deck    TEXT NOT NULL,
+    note_id INTEGER NOT NULL REFERENCES notes(id) ON DELETE CASCADE,
+    PRIMARY KEY (deck, note_id)
+);
+CREATE TABLE IF NOT EXISTS synced_decks (
+    deck    TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS models (
+    name    TEXT PRIMARY KEY,
+    fields  TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tags_tag ON tags(tag);
+CREATE INDEX IF NOT EXISTS idx_cards_note ON cards(note_id);
+CREATE INDEX IF NOT EXISTS idx_deck_notes_note ON deck_notes(note_id);
+"""
+
+DECK_QUERY = re.compile(r'^deck:"([^"]+)"$')
+
+
+class Mirror:
+    """A local SQLite copy of one or more decks."""
+
+    def __init__(self, path: str = MIRROR_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # -----------------------------------------------------------------------
+    # Sync
+    # -----------------------------------------------------------------------
+
+    def sync(self, decks: list[str] = DECKS) -> dict:
+        """
+        Bring the mirror up to date with Anki for the given decks.
+
+        Returns:
+            {"added": n, "changed": n, "deleted": n}
+        """
+        stats = {"added": 0, "changed": 0, "deleted": 0}
+
+        with self.db:
+            self._sync_models()
+            for deck in decks:
+                ids = anki_client.find_notes(f'deck:"{deck}"')
+                known = dict(self.db.execute(
+                    "SELECT n.id, n.mod FROM notes n JOIN deck_notes d ON d.note_id = n.id WHERE d.deck = ?",
+                    (deck,)))
+
+                try:
+                    mods = anki_client.invoke("notesModTime", notes=ids)
+                    current = {info["noteId"]: info["mod"] for info in mods if info}
+                except Exception as e:
+                    if "unsupported action" not in str(e):
+                        raise
+                    current = {nid: None for nid in ids}
+
+                fetch = [nid for nid, mod in current.items() if mod is None or known.get(nid) != mod]
+                for note in anki_client.get_notes_info(fetch) if fetch else []:
+                    if not note:
+                        continue
+                    if note["noteId"] in known:
+                        stats["changed"] += known[note["noteId"]] != note.get("mod")
+                    else:
+                        stats["added"] += 1
+                    self._store(note, deck)
+
+                removed = [(deck, nid) for nid in known if nid not in current]
+                self.db.executemany("DELETE FROM deck_notes WHERE deck = ? AND note_id = ?", removed)
+                stats["deleted"] += len(removed)
+                self.db.execute("INSERT OR IGNORE INTO synced_decks (deck) VALUES (?)", (deck,))
+
+            self.db.execute("DELETE FROM notes WHERE id NOT IN (SELECT note_id FROM deck_notes)")
+
+        return stats
+
+    def _sync_models(self):
+        rows = [(name, json.dumps(anki_client.get_model_field_names(name)))
+                for name in anki_client.get_model_names()]
+        self.db.execute("DELETE FROM models")
+        self.db.executemany("INSERT INTO models (name, fields) VALUES (?, ?)", rows)
+
+    def _store(self, note: dict, deck: str):
+        nid = note["noteId"]
+        self.db.execute("INSERT INTO notes (id, model, mod) VALUES (?, ?, ?) "
+                        "ON CONFLICT(id) DO UPDATE SET model = excluded.model, mod = excluded.mod",
+                        (nid, note["modelName"], note.get("mod", 0)))
+        for table in ("fields", "tags", "cards"):
+            self.db.execute(f"DELETE FROM {table} WHERE note_id = ?", (nid,))
+        self.db.executemany("INSERT INTO fields (note_id, name, ord, value) VALUES (?, ?, ?, ?)",
+                            [(nid, name, f["order"], f["value"]) for name, f in note["fields"].items()])
+        self.db.executemany("INSERT INTO tags (note_id, tag) VALUES (?, ?)",
+                            [(nid, tag) for tag in dict.fromkeys(note["tags"])])
+        self.db.executemany("INSERT INTO cards (id, note_id, ord) VALUES (?, ?, ?)",
+                            [(cid, nid, i) for i, cid in enumerate(note.get("cards", []))])
+        self.db.execute("INSERT OR IGNORE INTO deck_notes (deck, note_id) VALUES (?, ?)", (deck, nid))
+
+    # -----------------------------------------------------------------------
+    # Read API (same names as anki_client)
+    # -----------------------------------------------------------------------
+
+    def find_notes(self, query: str) -> list[int]:
+        """
+        Only `deck:"<name>"` queries are supported offline. Raises LookupError
+        for a deck that has never been synced, rather than answering [].
+        """
+        match = DECK_QUERY.match(query.strip())
+        if match is None:
+            raise ValueError(f"Offline mirror only supports deck:\"...\" queries, got: {query}")
+        deck = match.group(1)
+        if not self.is_synced(deck):
+            raise LookupError(f"Deck \"{deck}\" is not in the offline mirror; run: python anki_mirror.py sync \"{deck}\"")
+        return [row[0] for row in self.db.execute(
+            "SELECT note_id FROM deck_notes WHERE deck = ? ORDER BY note_id", (deck,))]
+
+    def is_synced(self, deck: str) -> bool:
+        # Mirrors synced before synced_decks existed only show up in deck_notes.
+        return any(self.db.execute(
+            "SELECT 1 FROM synced_decks WHERE deck = ? UNION ALL SELECT 1 FROM deck_notes WHERE deck = ? LIMIT 1",
+            (deck, deck)))
+
+    def get_notes_info(self, note_ids: list[int], cached: bool = False) -> list[dict]:
+        """
+        Same shape as notesInfo, including {} for ids not in the mirror.
+        `cached` is accepted for drop-in compatibility with anki_client.
+        """
+        notes = {}
+        for chunk in _chunks(note_ids, 500):
+            marks = ",".join("?" * len(chunk))
+            for nid, model, mod in self.db.execute(
+                    f"SELECT id, model, mod FROM notes WHERE id IN ({marks})", chunk):
+                notes[nid] = {"noteId": nid, "tags": [], "fields": {}, "modelName": model, "mod": mod, "cards": []}
+            for nid, name, ord_, value in self.db.execute(
+                    f"SELECT note_id, name, ord, value FROM fields WHERE note_id IN ({marks}) ORDER BY note_id, ord", chunk):
+                notes[nid]["fields"][name] = {"value": value, "order": ord_}
+            for nid, tag in self.db.execute(
+                    f"SELECT note_id, tag FROM tags WHERE note_id IN ({marks}) ORDER BY rowid", chunk):
+                notes[nid]["tags"].append(tag)
+            for nid, cid in self.db.execute(
+                    f"SELECT note_id, id FROM cards WHERE note_id IN ({marks}) ORDER BY note_id, ord", chunk):
+                notes[nid]["cards"].append(cid)
+        return [notes.get(nid, {}) for nid in note_ids]
+
+    def deck_notes(self, deck: str) -> list[dict]:
+        """find_notes + get_notes_info for a whole deck."""
+        return self.get_notes_info(self.find_notes(f'deck:"{deck}"'))
+
+    def get_model_names(self) -> list[str]:
+        return [row[0] for row in self.db.execute("SELECT name FROM models ORDER BY name")]
+
+    def get_model_field_names(self, model_name: str) -> list[str]:
+        row = self.db.execute("SELECT fields FROM models WHERE name = ?", (model_name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "sync":
+        print(__doc__)
+        sys.exit(1)
+
+    decks = sys.argv[2:] or DECKS
+    mirror = Mirror()
+    stats = mirror.sync(decks)
+    print(f"🔄 Synced {len(decks)} deck(s): "
+          f"{stats['added']} added, {stats['changed']} changed, {stats['deleted']} deleted")
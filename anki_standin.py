@@ -0,0 +1,888 @@
+"""
+anki_standin.py
+---------------
+A pure-stdlib stand-in for Anki + AnkiConnect, backed by SQLite.
+
+It serves the same action surface as AnkiConnect.py (plus the newer actions
+our scripts use: createDeck, deleteNotes, updateNoteModel, modelStyling,
+updateModelStyling, notesModTime) so scripts, load tests and benchmarks
+can run without Anki desktop. GUI actions reply "unsupported action".
+
+Usage:
+    python anki_standin.py [--port 8765] [--db standin.sqlite3]
+
+    # or in-process, e.g. from a benchmark:
+    server = serve_in_thread(port=0)
+    anki_client.set_url(f"http://127.0.0.1:{server.server_port}")
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import urllib.request
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+API_VERSION = 5
+COMPRESS_MIN_SIZE = 1024
+FIELD_SEPARATOR = "\x1f"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decks (
+    id      INTEGER PRIMARY KEY,
+    name    TEXT NOT NULL UNIQUE,
+    conf    INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS dconf (
+    id      INTEGER PRIMARY KEY,
+    config  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS models (
+    id      INTEGER PRIMARY KEY,
+    name    TEXT NOT NULL UNIQUE,
+    fields  TEXT NOT NULL,
+    tmpls   TEXT NOT NULL,
+    css     TEXT NOT NULL,
+    cloze   INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS notes (
+    id      INTEGER PRIMARY KEY,
+    mid     INTEGER NOT NULL,
+    mod     INTEGER NOT NULL,
+    tags    TEXT NOT NULL,
+    flds    TEXT NOT NULL,
+    sfld    TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id      INTEGER PRIMARY KEY,
+    nid     INTEGER NOT NULL,
+    did     INTEGER NOT NULL,
+    ord     INTEGER NOT NULL,
+    mod     INTEGER NOT NULL,
+    type    INTEGER NOT NULL DEFAULT 0,
+    queue   INTEGER NOT NULL DEFAULT 0,
+    due     INTEGER NOT NULL DEFAULT 0,
+    ivl     INTEGER NOT NULL DEFAULT 0,
+    factor  INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS revlog (
+    id      INTEGER PRIMARY KEY,
+    cid     INTEGER NOT NULL,
+    ivl     INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS media (
+    filename TEXT PRIMARY KEY,
+    data     BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_notes_mid ON notes(mid);
+CREATE INDEX IF NOT EXISTS ix_notes_sfld ON notes(mid, sfld);
+CREATE INDEX IF NOT EXISTS ix_cards_nid ON cards(nid);
+CREATE INDEX IF NOT EXISTS ix_cards_did ON cards(did);
+CREATE INDEX IF NOT EXISTS ix_revlog_cid ON revlog(cid);
+"""
+
+DEFAULT_CSS = ".card {\n font-family: arial;\n font-size: 20px;\n text-align: center;\n color: black;\n background-color: white;\n}\n"
+
+DEFAULT_MODELS = [
+    ("Basic", ["Front", "Back"], [
+        ("Card 1", "{{Front}}", "{{FrontSide}}<hr id=answer>{{Back}}"),
+    ], False),
+    ("Basic (and reversed card)", ["Front", "Back"], [
+        ("Card 1", "{{Front}}", "{{FrontSide}}<hr id=answer>{{Back}}"),
+        ("Card 2", "{{Back}}", "{{FrontSide}}<hr id=answer>{{Front}}"),
+    ], False),
+    ("Basic (optional reversed card)", ["Front", "Back", "Add Reverse"], [
+        ("Card 1", "{{Front}}", "{{FrontSide}}<hr id=answer>{{Back}}"),
+        ("Card 2", "{{#Add Reverse}}{{Back}}{{/Add Reverse}}", "{{FrontSide}}<hr id=answer>{{Front}}"),
+    ], False),
+    ("Cloze", ["Text", "Back Extra"], [
+        ("Cloze", "{{cloze:Text}}", "{{cloze:Text}}<br>{{Back Extra}}"),
+    ], True),
+]
+
+DEFAULT_DECK_CONFIG = {
+    "id": 1, "name": "Default", "replayq": True, "maxTaken": 60, "timer": 0, "autoplay": True, "dyn": False,
+    "new": {"perDay": 20, "delays": [1, 10], "ints": [1, 4, 7], "initialFactor": 2500, "order": 1},
+    "rev": {"perDay": 100, "ease4": 1.3, "maxIvl": 36500},
+    "lapse": {"delays": [10], "mult": 0, "minInt": 1, "leechFails": 8, "leechAction": 0},
+}
+
+CLOZE = re.compile(r"{{c(\d+)::(.*?)(?:::(.*?))?}}", re.S)
+SEARCH_TOKEN = re.compile(r'-?(?:[^\s"]*"[^"]*"|[^\s"]+)')
+
+
+def action(func):
+    """Mark a StandinAnki method as a callable API action."""
+    func.api = True
+    return func
+
+
+def ids2str(ids) -> str:
+    return "(" + ",".join(str(int(i)) for i in ids) + ")"
+
+
+def _verify_note(note) -> bool:
+    return (
+        isinstance(note, dict) and
+        isinstance(note.get("deckName"), str) and
+        isinstance(note.get("modelName"), str) and
+        isinstance(note.get("fields", {}), dict) and
+        all(isinstance(k, str) and isinstance(v, str) for k, v in note.get("fields", {}).items()) and
+        isinstance(note.get("tags", []), list) and
+        all(isinstance(t, str) for t in note.get("tags", []))
+    )
+
+
+# ---------------------------------------------------------------------------
+# Collection
+# ---------------------------------------------------------------------------
+
+class StandinAnki:
+    """The action implementations, over one SQLite database."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self._last_id = 0
+        with self.db:
+            self.db.executescript(SCHEMA)
+            if self.db.execute("SELECT count() FROM decks").fetchone()[0] == 0:
+                self.db.execute("INSERT INTO decks (id, name) VALUES (1, 'Default')")
+                self.db.execute("INSERT INTO dconf (id, config) VALUES (1, ?)", (json.dumps(DEFAULT_DECK_CONFIG),))
+                for name, fields, tmpls, cloze in DEFAULT_MODELS:
+                    self._insert_model(name, fields, tmpls, DEFAULT_CSS, cloze)
+        self.actions = {
+            name: getattr(self, name) for name in dir(self)
+            if getattr(getattr(self, name), "api", False)
+        }
+
+    # -----------------------------------------------------------------------
+    # Dispatch
+    # -----------------------------------------------------------------------
+
+    def handle(self, request: dict):
+        """Run one AnkiConnect request; replies follow AnkiConnect's versioning."""
+        name = request.get("action", "")
+        version = request.get("version", 4)
+        params = request.get("params", {})
+        reply = {"result": None, "error": None}
+
+        try:
+            method = self.actions.get(name)
+            if method is None:
+                raise Exception("unsupported action")
+            with self.lock, self.db:
+                reply["result"] = method(**params)
+        except Exception as e:
+            reply["error"] = str(e)
+
+        return reply if version > 4 else reply["result"]
+
+    # -----------------------------------------------------------------------
+    # Helpers
+    # -----------------------------------------------------------------------
+
+    def _new_id(self) -> int:
+        self._last_id = max(self._last_id + 1, int(time.time() * 1000))
+        return self._last_id
+
+    def _insert_model(self, name, fields, tmpls, css, cloze=False):
+        mid = self._new_id()
+        tmpls = [{"name": n, "ord": i, "qfmt": q, "afmt": a} for i, (n, q, a) in enumerate(tmpls)]
+        self.db.execute("INSERT INTO models (id, name, fields, tmpls, css, cloze) VALUES (?, ?, ?, ?, ?, ?)",
+                        (mid, name, json.dumps(fields), json.dumps(tmpls), css, int(cloze)))
+        return mid
+
+    def _model(self, name=None, mid=None):
+        if mid is not None:
+            row = self.db.execute("SELECT id, name, fields, tmpls, css, cloze FROM models WHERE id = ?", (mid,)).fetchone()
+        else:
+            row = self.db.execute("SELECT id, name, fields, tmpls, css, cloze FROM models WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "name": row[1], "flds": json.loads(row[2]), "tmpls": json.loads(row[3]),
+                "css": row[4], "cloze": bool(row[5])}
+
+    def _deck_id(self, name, create=False):
+        row = self.db.execute("SELECT id FROM decks WHERE name = ?", (name,)).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            return None
+        # Like Anki, creating "a::b" also creates the parent "a".
+        if "::" in name:
+            self._deck_id(name.rsplit("::", 1)[0], create=True)
+        did = self._new_id()
+        self.db.execute("INSERT INTO decks (id, name) VALUES (?, ?)", (did, name))
+        return did
+
+    def _deck_ids_matching(self, pattern):
+        regex = re.compile("^" + re.escape(pattern).replace(r"\*", ".*") + "(::.*)?$", re.I)
+        return [did for did, name in self.db.execute("SELECT id, name FROM decks") if regex.match(name)]
+
+    def _card_ords(self, model, values):
+        """Which templates produce a card for these field values."""
+        if model["cloze"]:
+            return sorted({int(n) - 1 for n in _cloze_numbers(values)}) or [0]
+        ords = []
+        fields = dict(zip(model["flds"], values))
+        for tmpl in model["tmpls"]:
+            if _render(tmpl["qfmt"], fields).strip():
+                ords.append(tmpl["ord"])
+        return ords
+
+    def _generate_cards(self, nid, model, values, did):
+        existing = {row[0] for row in self.db.execute("SELECT ord FROM cards WHERE nid = ?", (nid,))}
+        now = int(time.time())
+        for ord_ in self._card_ords(model, values):
+            if ord_ not in existing:
+                self.db.execute("INSERT INTO cards (id, nid, did, ord, mod, due) VALUES (?, ?, ?, ?, ?, ?)",
+                                (self._new_id(), nid, did, ord_, now, nid % 100000))
+
+    def _set_fields(self, nid, values):
+        self.db.execute("UPDATE notes SET flds = ?, sfld = ?, mod = ? WHERE id = ?",
+                        (FIELD_SEPARATOR.join(values), values[0] if values else "", int(time.time()), nid))
+
+    def _delete_orphan_notes(self, nids):
+        self.db.execute("DELETE FROM notes WHERE id IN " + ids2str(nids) +
+                        " AND id NOT IN (SELECT nid FROM cards)")
+
+    def _note_row(self, nid):
+        return self.db.execute("SELECT id, mid, mod, tags, flds FROM notes WHERE id = ?", (nid,)).fetchone()
+
+    def _is_duplicate(self, mid, first_field):
+        return self.db.execute("SELECT 1 FROM notes WHERE mid = ? AND sfld = ? LIMIT 1", (mid, first_field)).fetchone() is not None
+
+    def _create_note(self, note):
+        """Validate a note dict; returns (model, did, values) or None like AnkiBridge.createNote."""
+        if not _verify_note(note):
+            return None
+        model = self._model(note["modelName"])
+        if model is None:
+            return None
+        did = self._deck_id(note["deckName"])
+        if did is None:
+            return None
+        values = [note.get("fields", {}).get(name, "") for name in model["flds"]]
+        if not values or not values[0].strip():
+            return None
+        allow_duplicate = (note.get("options") or {}).get("allowDuplicate", False)
+        if not allow_duplicate and self._is_duplicate(model["id"], values[0]):
+            return None
+        return model, did, values
+
+    def _tags_string(self, tags):
+        tags = sorted(set(tags), key=str.lower)
+        return " " + " ".join(tags) + " " if tags else ""
+
+    def _search(self, query, cards=False):
+        """Translate an Anki search into SQL over notes n JOIN cards c."""
+        where, args = [], []
+        for token in SEARCH_TOKEN.findall(query or ""):
+            negate = token.startswith("-")
+            if negate:
+                token = token[1:]
+            token = token.replace('"', "")
+            if not token or token == "*":
+                continue
+
+            key, sep, value = token.partition(":")
+            key = key.lower() if sep else ""
+            if key == "deck":
+                clause = "c.did IN " + ids2str(self._deck_ids_matching(value))
+            elif key == "tag":
+                like = value.replace("*", "%")
+                clause = "(n.tags LIKE ? OR n.tags LIKE ?)"
+                args += [f"% {like} %", f"% {like}::%"]
+            elif key == "note":
+                clause = "n.mid IN (SELECT id FROM models WHERE name LIKE ?)"
+                args.append(value.replace("*", "%"))
+            elif key == "nid":
+                clause = "n.id IN " + ids2str(value.split(","))
+            elif key == "cid":
+                clause = "c.id IN " + ids2str(value.split(","))
+            elif key == "is" and value in ("new", "suspended", "due", "review"):
+                clause = {
+                    "new": "c.type = 0",
+                    "suspended": "c.queue = -1",
+                    "due": f"(c.queue IN (2, 3) AND c.due <= {_today()})",
+                    "review": "c.type = 2",
+                }[value]
+            elif key == "" or key in ("front", "back", "text"):
+                clause = "n.flds LIKE ?"
+                args.append("%" + (value if sep else token).replace("*", "%") + "%")
+            else:
+                raise Exception(f"unsupported search: {token}")
+
+            where.append(("NOT " if negate else "") + clause)
+
+        sql = ("SELECT c.id FROM cards c JOIN notes n ON n.id = c.nid" if cards
+               else "SELECT DISTINCT n.id FROM notes n JOIN cards c ON c.nid = n.id")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY c.id" if cards else " ORDER BY n.id"
+        return [row[0] for row in self.db.execute(sql, args)]
+
+    def _fields_info(self, model, values):
+        return {name: {"value": values[i] if i < len(values) else "", "order": i}
+                for i, name in enumerate(model["flds"])}
+
+    # -----------------------------------------------------------------------
+    # Misc
+    # -----------------------------------------------------------------------
+
+    @action
+    def version(self):
+        return API_VERSION
+
+    @action
+    def multi(self, actions):
+        return [self.handle(item) for item in actions]
+
+    @action
+    def upgrade(self):
+        return False
+
+    # -----------------------------------------------------------------------
+    # Media
+    # -----------------------------------------------------------------------
+
+    @action
+    def storeMediaFile(self, filename, data):
+        self.db.execute("INSERT OR REPLACE INTO media (filename, data) VALUES (?, ?)",
+                        (filename, base64.b64decode(data)))
+
+    @action
+    def retrieveMediaFile(self, filename):
+        row = self.db.execute("SELECT data FROM media WHERE filename = ?", (filename,)).fetchone()
+        return base64.b64encode(row[0]).decode("ascii") if row else False
+
+    @action
+    def deleteMediaFile(self, filename):
+        self.db.execute("DELETE FROM media WHERE filename = ?", (filename,))
+
+    # -----------------------------------------------------------------------
+    # Decks
+    # -----------------------------------------------------------------------
+
+    @action
+    def deckNames(self):
+        return [row[0] for row in self.db.execute("SELECT name FROM decks ORDER BY name")]
+
+    @action
+    def deckNamesAndIds(self):
+        return {name: did for did, name in self.db.execute("SELECT id, name FROM decks")}
+
+    @action
+    def deckNameFromId(self, deckId):
+        row = self.db.execute("SELECT name FROM decks WHERE id = ?", (deckId,)).fetchone()
+        return row[0] if row else None
+
+    @action
+    def createDeck(self, deck):
+        return self._deck_id(deck, create=True)
+
+    @action
+    def deleteDecks(self, decks, cardsToo=False):
+        for name in decks:
+            did = self._deck_id(name)
+            if did is None or did == 1:
+                continue
+            if cardsToo:
+                nids = [row[0] for row in self.db.execute("SELECT DISTINCT nid FROM cards WHERE did = ?", (did,))]
+                self.db.execute("DELETE FROM cards WHERE did = ?", (did,))
+                self._delete_orphan_notes(nids)
+            else:
+                self.db.execute("UPDATE cards SET did = 1 WHERE did = ?", (did,))
+            self.db.execute("DELETE FROM decks WHERE id = ?", (did,))
+
+    @action
+    def getDecks(self, cards):
+        decks = {}
+        for cid, name in self.db.execute(
+                "SELECT c.id, d.name FROM cards c JOIN decks d ON d.id = c.did WHERE c.id IN " + ids2str(cards)):
+            decks.setdefault(name, []).append(cid)
+        return decks
+
+    @action
+    def changeDeck(self, cards, deck):
+        did = self._deck_id(deck, create=True)
+        self.db.execute("UPDATE cards SET did = ?, mod = ? WHERE id IN " + ids2str(cards), (did, int(time.time())))
+
+    @action
+    def getDeckConfig(self, deck):
+        row = self.db.execute("SELECT conf FROM decks WHERE name = ?", (deck,)).fetchone()
+        if row is None:
+            return False
+        return json.loads(self.db.execute("SELECT config FROM dconf WHERE id = ?", (row[0],)).fetchone()[0])
+
+    @action
+    def saveDeckConfig(self, config):
+        if self.db.execute("SELECT 1 FROM dconf WHERE id = ?", (config["id"],)).fetchone() is None:
+            return False
+        config = dict(config, mod=int(time.time()))
+        self.db.execute("UPDATE dconf SET config = ? WHERE id = ?", (json.dumps(config), config["id"]))
+        return True
+
+    @action
+    def setDeckConfigId(self, decks, configId):
+        names = set(self.deckNames())
+        if any(deck not in names for deck in decks):
+            return False
+        if self.db.execute("SELECT 1 FROM dconf WHERE id = ?", (configId,)).fetchone() is None:
+            return False
+        self.db.executemany("UPDATE decks SET conf = ? WHERE name = ?", [(configId, deck) for deck in decks])
+        return True
+
+    @action
+    def cloneDeckConfigId(self, name, cloneFrom=1):
+        row = self.db.execute("SELECT config FROM dconf WHERE id = ?", (cloneFrom,)).fetchone()
+        if row is None:
+            return False
+        config = json.loads(row[0])
+        config["id"] = self._new_id()
+        config["name"] = name
+        self.db.execute("INSERT INTO dconf (id, config) VALUES (?, ?)", (config["id"], json.dumps(config)))
+        return config["id"]
+
+    @action
+    def removeDeckConfigId(self, configId):
+        if configId == 1 or self.db.execute("SELECT 1 FROM dconf WHERE id = ?", (configId,)).fetchone() is None:
+            return False
+        self.db.execute("DELETE FROM dconf WHERE id = ?", (configId,))
+        self.db.execute("UPDATE decks SET conf = 1 WHERE conf = ?", (configId,))
+        return True
+
+    # -----------------------------------------------------------------------
+    # Models
+    # -----------------------------------------------------------------------
+
+    @action
+    def modelNames(self):
+        return [row[0] for row in self.db.execute("SELECT name FROM models ORDER BY name")]
+
+    @action
+    def modelNamesAndIds(self):
+        return {name: mid for mid, name in self.db.execute("SELECT id, name FROM models")}
+
+    @action
+    def modelNameFromId(self, modelId):
+        model = self._model(mid=modelId)
+        return model["name"] if model else None
+
+    @action
+    def modelFieldNames(self, modelName):
+        model = self._model(modelName)
+        return model["flds"] if model else None
+
+    @action
+    def modelFieldsOnTemplates(self, modelName):
+        model = self._model(modelName)
+        if model is None:
+            return None
+        templates = {}
+        for tmpl in model["tmpls"]:
+            sides = []
+            for side in ("qfmt", "afmt"):
+                names = []
+                for match in re.findall("{{[^#/}]+?}}", tmpl[side]):
+                    name = re.sub(r"[{}]", "", match).split(":")[-1]
+                    if name == "FrontSide" or side == "afmt" and name in sides[0]:
+                        continue
+                    names.append(name)
+                sides.append(names)
+            templates[tmpl["name"]] = sides
+        return templates
+
+    @action
+    def modelStyling(self, modelName):
+        model = self._model(modelName)
+        if model is None:
+            raise Exception(f"model was not found: {modelName}")
+        return {"css": model["css"]}
+
+    @action
+    def updateModelStyling(self, model):
+        found = self._model(model["name"])
+        if found is None:
+            raise Exception(f"model was not found: {model['name']}")
+        self.db.execute("UPDATE models SET css = ? WHERE id = ?", (model["css"], found["id"]))
+
+    # -----------------------------------------------------------------------
+    # Notes
+    # -----------------------------------------------------------------------
+
+    @action
+    def addNote(self, note):
+        created = self._create_note(note)
+        if created is None:
+            return None
+        model, did, values = created
+
+        audio = note.get("audio") or {}
+        if audio.get("url") and audio.get("filename") and audio.get("fields"):
+            data = _download(audio["url"])
+            if data is not None and audio.get("skipHash") != hashlib.md5(data).hexdigest():
+                for i, name in enumerate(model["flds"]):
+                    if name in audio["fields"]:
+                        values[i] += f"[sound:{audio['filename']}]"
+                self.db.execute("INSERT OR REPLACE INTO media (filename, data) VALUES (?, ?)", (audio["filename"], data))
+
+        nid = self._new_id()
+        self.db.execute("INSERT INTO notes (id, mid, mod, tags, flds, sfld) VALUES (?, ?, ?, ?, ?, ?)",
+                        (nid, model["id"], int(time.time()), self._tags_string(note.get("tags", [])),
+                         FIELD_SEPARATOR.join(values), values[0]))
+        self._generate_cards(nid, model, values, did)
+        return nid
+
+    @action
+    def addNotes(self, notes):
+        return [self.addNote(note) for note in notes]
+
+    @action
+    def canAddNotes(self, notes):
+        return [self._create_note(note) is not None for note in notes]
+
+    @action
+    def updateNoteFields(self, note):
+        row = self._note_row(note["id"])
+        if row is None:
+            raise Exception("Failed to get note:{}".format(note["id"]))
+        model = self._model(mid=row[1])
+        values = row[4].split(FIELD_SEPARATOR)
+        for name, value in note["fields"].items():
+            if name in model["flds"]:
+                values[model["flds"].index(name)] = value
+        self._set_fields(row[0], values)
+
+    @action
+    def updateNotesFields(self, notes):
+        results = []
+        for note in notes:
+            try:
+                self.updateNoteFields(note)
+            except Exception:
+                results.append(False)
+            else:
+                results.append(True)
+        return results
+
+    @action
+    def updateNoteModel(self, note):
+        row = self._note_row(note["id"])
+        if row is None:
+            raise Exception(f"note was not found: {note['id']}")
+        model = self._model(note["modelName"])
+        if model is None:
+            raise Exception(f"model was not found: {note['modelName']}")
+
+        values = [note.get("fields", {}).get(name, "") for name in model["flds"]]
+        self.db.execute("UPDATE notes SET mid = ? WHERE id = ?", (model["id"], row[0]))
+        self._set_fields(row[0], values)
+        if "tags" in note:
+            self.db.execute("UPDATE notes SET tags = ? WHERE id = ?", (self._tags_string(note["tags"]), row[0]))
+
+        # Keep cards whose template still exists, then add any new ones.
+        valid = self._card_ords(model, values)
+        self.db.execute("DELETE FROM cards WHERE nid = ? AND ord NOT IN " + ids2str(valid or [-1]), (row[0],))
+        did = self.db.execute("SELECT did FROM cards WHERE nid = ? LIMIT 1", (row[0],)).fetchone()
+        self._generate_cards(row[0], model, values, did[0] if did else 1)
+
+    @action
+    def deleteNotes(self, notes):
+        self.db.execute("DELETE FROM cards WHERE nid IN " + ids2str(notes))
+        self.db.execute("DELETE FROM notes WHERE id IN " + ids2str(notes))
+
+    @action
+    def addTags(self, notes, tags, add=True):
+        change = [t for t in tags.split() if t]
+        now = int(time.time())
+        for nid, current in self.db.execute("SELECT id, tags FROM notes WHERE id IN " + ids2str(notes)).fetchall():
+            existing = current.split()
+            if add:
+                updated = existing + [t for t in change if t.lower() not in {e.lower() for e in existing}]
+            else:
+                drop = {t.lower() for t in change}
+                updated = [t for t in existing if t.lower() not in drop]
+            if updated != existing:
+                self.db.execute("UPDATE notes SET tags = ?, mod = ? WHERE id = ?", (self._tags_string(updated), now, nid))
+
+    @action
+    def removeTags(self, notes, tags):
+        return self.addTags(notes, tags, False)
+
+    @action
+    def getTags(self):
+        tags = set()
+        for (row,) in self.db.execute("SELECT tags FROM notes"):
+            tags.update(row.split())
+        return sorted(tags, key=str.lower)
+
+    @action
+    def findNotes(self, query=None):
+        return self._search(query) if query is not None else []
+
+    @action
+    def notesInfo(self, notes):
+        rows = {row[0]: row for row in self.db.execute(
+            "SELECT id, mid, mod, tags, flds FROM notes WHERE id IN " + ids2str(notes))}
+        cards = {}
+        for nid, cid in self.db.execute("SELECT nid, id FROM cards WHERE nid IN " + ids2str(notes) + " ORDER BY nid, ord"):
+            cards.setdefault(nid, []).append(cid)
+
+        models = {}
+        result = []
+        for nid in notes:
+            row = rows.get(nid)
+            if row is None:
+                result.append({})
+                continue
+            model = models.get(row[1]) or models.setdefault(row[1], self._model(mid=row[1]))
+            result.append({
+                "noteId": nid,
+                "tags": row[3].split(),
+                "fields": self._fields_info(model, row[4].split(FIELD_SEPARATOR)),
+                "modelName": model["name"],
+                "mod": row[2],
+                "cards": cards.get(nid, []),
+            })
+        return result
+
+    @action
+    def notesModTime(self, notes):
+        mods = dict(self.db.execute("SELECT id, mod FROM notes WHERE id IN " + ids2str(notes)))
+        return [{"noteId": nid, "mod": mods[nid]} if nid in mods else {} for nid in notes]
+
+    # -----------------------------------------------------------------------
+    # Cards
+    # -----------------------------------------------------------------------
+
+    @action
+    def findCards(self, query=None):
+        return self._search(query, cards=True) if query is not None else []
+
+    @action
+    def cardsToNotes(self, cards):
+        return [row[0] for row in self.db.execute("SELECT DISTINCT nid FROM cards WHERE id IN " + ids2str(cards))]
+
+    @action
+    def cardsInfo(self, cards, render=True, css=True):
+        rows = {row[0]: row for row in self.db.execute(
+            "SELECT c.id, c.nid, c.did, c.ord, c.ivl, c.factor, n.mid, n.flds, d.name "
+            "FROM cards c JOIN notes n ON n.id = c.nid JOIN decks d ON d.id = c.did WHERE c.id IN " + ids2str(cards))}
+        models = {}
+        css_sent = set()
+        result = []
+        for cid in cards:
+            row = rows.get(cid)
+            if row is None:
+                result.append({})
+                continue
+            model = models.get(row[6]) or models.setdefault(row[6], self._model(mid=row[6]))
+            values = row[7].split(FIELD_SEPARATOR)
+            info = {
+                "cardId": cid,
+                "fields": self._fields_info(model, values),
+                "fieldOrder": row[3],
+                "modelName": model["name"],
+                "deckName": row[8],
+                "factor": row[5],
+                "interval": row[4],
+                "note": row[1],
+            }
+            if render:
+                info["question"], info["answer"] = _render_card(model, values, row[3])
+            if css is True or (css == "model" and row[6] not in css_sent):
+                info["css"] = model["css"]
+                css_sent.add(row[6])
+            result.append(info)
+        return result
+
+    @action
+    def suspend(self, cards, suspend=True):
+        queues = dict(self.db.execute("SELECT id, queue FROM cards WHERE id IN " + ids2str(cards)))
+        changed = []
+        for cid in cards:
+            if cid in queues and (queues.pop(cid) == -1) != suspend:
+                changed.append(cid)
+        if suspend:
+            self.db.execute("UPDATE cards SET queue = -1 WHERE id IN " + ids2str(changed))
+        else:
+            self.db.execute("UPDATE cards SET queue = type WHERE id IN " + ids2str(changed))
+        return changed
+
+    @action
+    def unsuspend(self, cards):
+        return self.suspend(cards, False)
+
+    @action
+    def areSuspended(self, cards):
+        queues = dict(self.db.execute("SELECT id, queue FROM cards WHERE id IN " + ids2str(cards)))
+        return [queues[cid] == -1 if cid in queues else None for cid in cards]
+
+    @action
+    def areDue(self, cards):
+        rows = {cid: (ctype, queue, due) for cid, ctype, queue, due in self.db.execute(
+            "SELECT id, type, queue, due FROM cards WHERE id IN " + ids2str(cards))}
+        today = _today()
+        due = []
+        for cid in cards:
+            if cid not in rows:
+                due.append(False)
+                continue
+            ctype, queue, card_due = rows[cid]
+            due.append(ctype == 0 or (queue in (2, 3) and card_due <= today))
+        return due
+
+    @action
+    def getIntervals(self, cards, complete=False):
+        history = {}
+        for cid, ivl in self.db.execute("SELECT cid, ivl FROM revlog WHERE cid IN " + ids2str(cards) + " ORDER BY id"):
+            history.setdefault(cid, []).append(ivl)
+        new = {row[0] for row in self.db.execute("SELECT id FROM cards WHERE type = 0 AND id IN " + ids2str(cards))}
+        intervals = []
+        for cid in cards:
+            if complete:
+                intervals.append(0 if cid in new else history.get(cid, []))
+            else:
+                intervals.append(0 if cid in new or cid not in history else history[cid][-1])
+        return intervals
+
+
+def _cloze_numbers(values):
+    for value in values:
+        for match in CLOZE.finditer(value):
+            yield match.group(1)
+
+
+def _today() -> int:
+    return int(time.time() // 86400)
+
+
+def _render(template, fields):
+    def section(match):
+        return match.group(2) if fields.get(match.group(1), "").strip() else ""
+
+    text = re.sub(r"{{#(.+?)}}(.*?){{/\1}}", section, template, flags=re.S)
+    text = re.sub(r"{{\^(.+?)}}(.*?){{/\1}}", lambda m: "" if fields.get(m.group(1), "").strip() else m.group(2),
+                  text, flags=re.S)
+    return re.sub(r"{{([^{}]+?)}}", lambda m: fields.get(m.group(1).split(":")[-1], ""), text)
+
+
+def _render_card(model, values, ord_):
+    fields = dict(zip(model["flds"], values))
+    if model["cloze"]:
+        active = str(ord_ + 1)
+
+        def hide(match):
+            if match.group(1) == active:
+                return "[{}]".format(match.group(3) or "...")
+            return match.group(2)
+
+        def show(match):
+            return match.group(2)
+
+        tmpl = model["tmpls"][0]
+        question = _render(tmpl["qfmt"], {k: CLOZE.sub(hide, v) for k, v in fields.items()})
+        answer = _render(tmpl["afmt"], {k: CLOZE.sub(show, v) for k, v in fields.items()})
+        return question, answer
+
+    tmpl = model["tmpls"][ord_] if ord_ < len(model["tmpls"]) else model["tmpls"][0]
+    question = _render(tmpl["qfmt"], fields)
+    answer = _render(tmpl["afmt"], dict(fields, FrontSide=question))
+    return question, answer
+
+
+def _download(url):
+    try:
+        with urllib.request.urlopen(url, timeout=10) as resp:
+            return resp.read() if resp.status == 200 else None
+    except OSError:
+        return None
+
+
+# ---------------------------------------------------------------------------
+# HTTP server
+# ---------------------------------------------------------------------------
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    anki = None
+
+    def do_GET(self):
+        self._reply(f"AnkiConnect v.{API_VERSION}".encode("utf-8"))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        encoding = (self.headers.get("Content-Encoding") or "").lower()
+        try:
+            if encoding == "gzip":
+                body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+            elif encoding == "deflate":
+                body = zlib.decompress(body)
+            result = self.anki.handle(json.loads(body.decode("utf-8"))) if body else None
+        except (ValueError, zlib.error):
+            result = None
+        self._reply(json.dumps(result).encode("utf-8"))
+
+    def _reply(self, body):
+        accepted = (self.headers.get("Accept-Encoding") or "").lower()
+        encoding = None
+        if len(body) >= COMPRESS_MIN_SIZE:
+            if "gzip" in accepted:
+                encoding = "gzip"
+                compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+                body = compressor.compress(body) + compressor.flush()
+            elif "deflate" in accepted:
+                encoding = "deflate"
+                body = zlib.compress(body, 6)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/json")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host: str = "127.0.0.1", port: int = 8765, db: str = ":memory:") -> ThreadingHTTPServer:
+    """Build (but don't start) a stand-in server; port 0 picks a free port."""
+    handler = type("Handler", (StandinHandler,), {"anki": StandinAnki(db)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.anki = handler.anki
+    return server
+
+
+def serve_in_thread(host: str = "127.0.0.1", port: int = 0, db: str = ":memory:") -> ThreadingHTTPServer:
+    """Start a stand-in server on a daemon thread and return it."""
+    server = make_server(host, port, db)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pure-stdlib AnkiConnect stand-in backed by SQLite.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=":memory:", help="SQLite file (default: in-memory)")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.db)
+    print(f"🧪 AnkiConnect stand-in listening on http://{args.host}:{server.server_port} (db: {args.db})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
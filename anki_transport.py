@@ -0,0 +1,106 @@
+"""
+anki_transport.py
+-----------------
+Record / replay transports for anki_client.
+
+A transport is anything with `request(payload: bytes, timeout: float) -> bytes`
+and `close()`; anki_client.ConnectionPool is the real HTTP one. Install a
+transport with anki_client.set_transport(), or from the environment:
+
+    ANKI_RECORD=session.jsonl python fix_content_v2.py   # talk to Anki, log every exchange
+    ANKI_REPLAY=session.jsonl python fix_content_v2.py   # answer from the log, no Anki needed
+
+Each JSONL line holds one exchange:
+    {"request": {...}, "response": {...}, "seconds": 0.012}
+or, for a request that failed to reach Anki:
+    {"request": {...}, "error": "...", "seconds": 5.0}
+"""
+
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+
+class ReplayMiss(Exception):
+    """The replayed session has no (more) recorded answers for a request."""
+
+
+def _key(request: dict) -> str:
+    return json.dumps(request, sort_keys=True, ensure_ascii=False)
+
+
+class RecordingTransport:
+    """Forwards to `inner` and appends every request, response and timing to `path`."""
+
+    def __init__(self, inner, path: str):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def request(self, payload: bytes, timeout: float) -> bytes:
+        entry = {"request": json.loads(payload.decode("utf-8"))}
+        started = time.perf_counter()
+        try:
+            data = self.inner.request(payload, timeout)
+        except OSError as e:
+            entry["error"] = str(e) or type(e).__name__
+            raise
+        else:
+            entry["response"] = json.loads(data.decode("utf-8"))
+            return data
+        finally:
+            entry["seconds"] = round(time.perf_counter() - started, 6)
+            with self._lock:
+                self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    def close(self):
+        self.inner.close()
+        with self._lock:
+            self._file.close()
+
+
+class ReplayTransport:
+    """
+    Answers requests from a recorded JSONL session, with no Anki running.
+
+    Requests are matched on their full JSON content; identical requests get
+    their recorded answers in the original order (so a findNotes issued before
+    and after an update sees both results). With `realtime` each answer is
+    delayed by the recorded latency.
+    """
+
+    def __init__(self, path: str, realtime: bool = False):
+        self.path = path
+        self.realtime = realtime
+        self._lock = threading.Lock()
+        self._answers = defaultdict(deque)
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._answers[_key(entry["request"])].append(entry)
+
+    def request(self, payload: bytes, timeout: float) -> bytes:
+        request = json.loads(payload.decode("utf-8"))
+        with self._lock:
+            answers = self._answers.get(_key(request))
+            if not answers:
+                raise ReplayMiss(f"No recorded answer left for action {request.get('action')!r} in {self.path}")
+            entry = answers.popleft()
+
+        if self.realtime:
+            time.sleep(min(entry.get("seconds", 0.0), timeout))
+        if "error" in entry:
+            raise ConnectionError(entry["error"])
+        return json.dumps(entry["response"], ensure_ascii=False).encode("utf-8")
+
+    def remaining(self) -> int:
+        """Number of recorded exchanges not replayed yet."""
+        with self._lock:
+            return sum(len(answers) for answers in self._answers.values())
+
+    def close(self):
+        pass
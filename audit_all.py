@@ -1,10 +1,13 @@
 """
 audit_all.py - Dump all cards from all 3 decks into a single file for review.
+
+Pass --offline to read from the local mirror (python anki_mirror.py sync)
+instead of Anki.
 """
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
-import json
-from anki_client import find_notes, get_notes_info
+import asyncio
+from anki_async import AsyncAnkiClient
 
 DECKS = [
     "cpnl basic 1 [dev]",
@@ -12,10 +15,22 @@ DECKS = [
     "Verbs Essencials",
 ]
 
+
+async def fetch_all(decks):
+    """Fetch every deck concurrently; results keep the order of `decks`."""
+    async with AsyncAnkiClient() as anki:
+        return await asyncio.gather(*(anki.get_deck_notes(deck) for deck in decks))
+
+
+if "--offline" in sys.argv:
+    from anki_mirror import Mirror
+    mirror = Mirror()
+    deck_notes = [mirror.deck_notes(deck) for deck in DECKS]
+else:
+    deck_notes = asyncio.run(fetch_all(DECKS))
+
 with open("audit_all.txt", "w", encoding="utf-8") as f:
-    for deck in DECKS:
-        ids = find_notes(f'deck:"{deck}"')
-        notes = get_notes_info(ids)
+    for deck, notes in zip(DECKS, deck_notes):
         f.write(f"\n{'='*60}\n")
         f.write(f"  {deck}  ({len(notes)} cards)\n")
         f.write(f"{'='*60}\n\n")
@@ -0,0 +1,278 @@
+"""
+benchmark.py
+------------
+Throughput / latency benchmarks for the AnkiConnect client and server.
+Each benchmark talks to a live AnkiConnect endpoint, so open Anki first.
+
+Usage:
+    python benchmark.py keepalive [--calls 200] [--url http://localhost:8765]
+    python benchmark.py compression [--calls 20] [--query 'deck:"cpnl basic 1 [dev]"']
+    python benchmark.py replay --recording session.jsonl --script fix_content_v2.py [--calls 5]
+    python benchmark.py dispatch [--calls 2000]
+    python benchmark.py latency [--calls 200]
+    python benchmark.py upload [--calls 3] [--sizes 1,4,16]
+    python benchmark.py load [--clients 16] [--calls 200]
+    python benchmark.py notesinfo [--counts 1000,10000,100000] [--calls 3]
+
+`replay` needs no Anki: it reruns a script against a session recorded with
+ANKI_RECORD=session.jsonl (record it with an empty .anki_cache/ so the
+note cache doesn't change which requests are made).
+"""
+
+import argparse
+import base64
+import contextlib
+import http.client
+import io
+import json
+import os
+import runpy
+import statistics
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import anki_client
+import anki_transport
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def timed(fn, calls: int) -> float:
+    """Run `fn` `calls` times and return the achieved calls per second."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return calls / (time.perf_counter() - start)
+
+
+def timed_once(fn) -> float:
+    """Run `fn` once and return the elapsed seconds."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def report(label: str, rate: float, baseline: float = None):
+    line = f"  {label:<28} {rate:10.1f} calls/s"
+    if baseline:
+        line += f"   ({rate / baseline:.2f}x)"
+    print(line)
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def bench_keepalive(args):
+    """Fresh TCP connection per call (old behaviour) vs the pooled client."""
+    payload = json.dumps({"action": "version", "version": 6, "params": {}}).encode("utf-8")
+
+    def fresh_connection():
+        request = urllib.request.Request(args.url, payload, {"Connection": "close"})
+        urllib.request.urlopen(request, timeout=5).read()
+
+    print(f"\n=== keep-alive: {args.calls} x 'version' against {args.url} ===")
+    before = timed(fresh_connection, args.calls)
+    after = timed(lambda: anki_client.invoke("version"), args.calls)
+    report("new connection per call", before)
+    report("pooled keep-alive", after, before)
+
+
+def bench_compression(args):
+    """Bytes on the wire and latency of a large notesInfo/cardsInfo dump, plain vs gzip."""
+    note_ids = anki_client.find_notes(args.query)
+    card_ids = anki_client.invoke("findCards", query=args.query)
+    parsed = urllib.parse.urlsplit(args.url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=60)
+
+    def fetch(action, params, accept):
+        body = json.dumps({"action": action, "version": 6, "params": params}).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if accept:
+            headers["Accept-Encoding"] = accept
+        start = time.perf_counter()
+        conn.request("POST", parsed.path or "/", body, headers)
+        response = conn.getresponse()
+        data = response.read()
+        encoding = response.getheader("Content-Encoding")
+        if encoding:
+            anki_client.decode_body(data, encoding)
+        return len(data), time.perf_counter() - start
+
+    print(f"\n=== compression: {len(note_ids)} notes / {len(card_ids)} cards, {args.calls} runs each ===")
+    for action, params in (("notesInfo", {"notes": note_ids}), ("cardsInfo", {"cards": card_ids})):
+        plain_size = None
+        for accept in (None, "gzip", "deflate"):
+            runs = [fetch(action, params, accept) for _ in range(args.calls)]
+            size = runs[0][0]
+            latency = statistics.median(t for _, t in runs) * 1000
+            plain_size = plain_size or size
+            label = f"{action} {accept or 'identity'}"
+            print(f"  {label:<28} {size:10d} bytes ({size / plain_size:5.1%})   p50 {latency:8.1f} ms")
+    conn.close()
+
+
+def bench_dispatch(args):
+    """Server-side cost of resolving an action, measured through `multi`."""
+    one = [{"action": "version", "version": 6}]
+    many = one * args.calls
+
+    # A 1-item and an N-item multi share the HTTP/JSON overhead; the difference
+    # is N-1 dispatches of a trivial action.
+    anki_client.invoke("multi", actions=one)
+    single = min(timed_once(lambda: anki_client.invoke("multi", actions=one)) for _ in range(5))
+    bulk = min(timed_once(lambda: anki_client.invoke("multi", actions=many)) for _ in range(5))
+    per_action = (bulk - single) / (args.calls - 1)
+
+    print(f"\n=== dispatch: multi of {args.calls} x 'version' against {args.url} ===")
+    print(f"  {'per dispatched action':<28} {per_action * 1e6:10.1f} us")
+    print(f"  {'dispatches per second':<28} {1 / per_action:10.0f}")
+
+
+def bench_latency(args):
+    """Round-trip latency of a small call over a warm keep-alive connection."""
+    anki_client.invoke("version")
+    samples = sorted(timed_once(lambda: anki_client.invoke("version")) for _ in range(args.calls))
+
+    print(f"\n=== latency: {args.calls} x 'version' against {args.url} ===")
+    for label, q in (("p50", 0.5), ("p95", 0.95), ("max", 1.0)):
+        print(f"  {label:<28} {samples[min(int(q * len(samples)), len(samples) - 1)] * 1000:10.2f} ms")
+
+
+def bench_upload(args):
+    """Server-side throughput for multi-megabyte request bodies (storeMediaFile)."""
+    parsed = urllib.parse.urlsplit(args.url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=120)
+    filename = "_anki_catalan_benchmark.bin"
+
+    def post(action, params):
+        body = json.dumps({"action": action, "version": 6, "params": params}).encode("utf-8")
+        conn.request("POST", parsed.path or "/", body, {"Content-Type": "application/json"})
+        anki_client._unwrap(json.loads(conn.getresponse().read().decode("utf-8")))
+        return len(body)
+
+    print(f"\n=== upload: storeMediaFile bodies, {args.calls} runs each, against {args.url} ===")
+    try:
+        for megabytes in (int(size) for size in args.sizes.split(",")):
+            data = base64.b64encode(os.urandom(megabytes * 1024 * 1024 * 3 // 4)).decode("ascii")
+            runs = []
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                size = post("storeMediaFile", {"filename": filename, "data": data})
+                runs.append(time.perf_counter() - start)
+            best = min(runs)
+            print(f"  {f'{size / 1e6:.1f} MB body':<28} {best * 1000:10.1f} ms   {size / best / 1e6:8.1f} MB/s")
+    finally:
+        post("deleteMediaFile", {"filename": filename})
+        conn.close()
+
+
+def bench_load(args):
+    """Requests per second with many concurrent clients, each on its own connection."""
+    parsed = urllib.parse.urlsplit(args.url)
+    payload = json.dumps({"action": "version", "version": 6}).encode("utf-8")
+    latencies, failures = [], []
+
+    def client():
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+        try:
+            for _ in range(args.calls):
+                start = time.perf_counter()
+                conn.request("POST", parsed.path or "/", payload, {"Content-Type": "application/json"})
+                conn.getresponse().read()
+                latencies.append(time.perf_counter() - start)
+        except OSError as e:
+            failures.append(e)
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"\n=== load: {args.clients} clients x {args.calls} 'version' calls against {args.url} ===")
+    print(f"  {'throughput':<28} {len(latencies) / elapsed:10.1f} req/s")
+    if latencies:
+        print(f"  {'p50':<28} {latencies[len(latencies) // 2] * 1000:10.2f} ms")
+        print(f"  {'p95':<28} {latencies[int(len(latencies) * 0.95)] * 1000:10.2f} ms")
+    if failures:
+        print(f"  ⚠️  {len(failures)} client(s) failed, e.g. {failures[0]!r}")
+
+
+def bench_notesinfo(args):
+    """Server-side notesInfo cost at increasing note counts."""
+    note_ids = anki_client.find_notes("deck:*")
+    if not note_ids:
+        raise SystemExit("notesinfo needs a collection with notes")
+
+    print(f"\n=== notesInfo: {len(note_ids)} distinct notes in the collection, best of {args.calls} ===")
+    for count in (int(c) for c in args.counts.split(",")):
+        # Smaller collections repeat ids to reach the requested count.
+        ids = (note_ids * (count // len(note_ids) + 1))[:count]
+        best = min(timed_once(lambda: anki_client.invoke("notesInfo", notes=ids)) for _ in range(args.calls))
+        print(f"  {f'{count} notes':<28} {best * 1000:10.1f} ms   {count / best:10.0f} notes/s")
+
+
+def bench_replay(args):
+    """Client-side cost of a script, replayed from a recorded session."""
+    if not args.recording or not args.script:
+        raise SystemExit("replay needs --recording and --script")
+
+    timings = []
+    for _ in range(args.calls):
+        transport = anki_transport.ReplayTransport(args.recording)
+        anki_client.set_transport(transport)
+        with tempfile.TemporaryDirectory() as tmp:
+            anki_client._note_cache = anki_client.NoteCache(os.path.join(tmp, "notes.json"))
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(args.script, run_name="__main__")
+            timings.append(time.perf_counter() - start)
+
+    print(f"\n=== replay: {args.script} from {args.recording}, {args.calls} runs ===")
+    print(f"  p50 {statistics.median(timings) * 1000:8.1f} ms   min {min(timings) * 1000:8.1f} ms")
+    if transport.remaining():
+        print(f"  ⚠️  {transport.remaining()} recorded exchange(s) were not replayed")
+
+
+BENCHMARKS = {
+    "keepalive": bench_keepalive,
+    "compression": bench_compression,
+    "replay": bench_replay,
+    "dispatch": bench_dispatch,
+    "latency": bench_latency,
+    "upload": bench_upload,
+    "load": bench_load,
+    "notesinfo": bench_notesinfo,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--url", default=anki_client.ANKI_CONNECT_URL)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--query", default='deck:"cpnl basic 1 [dev]"')
+    parser.add_argument("--recording")
+    parser.add_argument("--script")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--counts", default="1000,10000,100000", help="note counts for notesinfo, comma separated")
+    parser.add_argument("--sizes", default="1,4,16", help="upload body sizes in MB, comma separated")
+    args = parser.parse_args()
+
+    anki_client.set_url(args.url)
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
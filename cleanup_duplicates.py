@@ -14,7 +14,7 @@ Comprehensive cleanup of cpnl basic 1 [dev]:
 
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
-from anki_client import find_notes, get_notes_info, invoke
+from anki_client import find_notes, get_notes_info, invoke, batch
 
 
 DECK = "cpnl basic 1 [dev]"
@@ -38,7 +38,7 @@ def add_tags(nids, tags_str):
 def remove_duplicates():
     print("\n── 1. Remove duplicate cards ──")
     ids = find_notes(f'deck:"{DECK}"')
-    notes = get_notes_info(ids)
+    notes = get_notes_info(ids, cached=True)
 
     seen = {}  # front_stripped -> first note
     to_delete = []
@@ -79,7 +79,7 @@ OLD_INDIVIDUAL_FRONTS = [
 def delete_old_individuals():
     print("\n── 2. Delete old unconsolidated cards ──")
     ids = find_notes(f'deck:"{DECK}"')
-    notes = get_notes_info(ids)
+    notes = get_notes_info(ids, cached=True)
 
     to_delete = []
     for n in notes:
@@ -140,7 +140,7 @@ REMAINING_FIXES = {
 def fix_remaining():
     print("\n── 3. Fix remaining errors ──")
     ids = find_notes(f'deck:"{DECK}"')
-    notes = get_notes_info(ids)
+    notes = get_notes_info(ids, cached=True)
 
     fixed = 0
     for n in notes:
@@ -186,7 +186,7 @@ TAG_MAP = {
 def add_missing_tags():
     print("\n── 4. Add missing tags ──")
     ids = find_notes(f'deck:"{DECK}"')
-    notes = get_notes_info(ids)
+    notes = get_notes_info(ids, cached=True)
 
     tagged = 0
     for n in notes:
@@ -207,7 +207,7 @@ def add_missing_tags():
 def fix_estovalles():
     print("\n── 5. Fix estovalles card ──")
     ids = find_notes(f'deck:"{DECK}"')
-    notes = get_notes_info(ids)
+    notes = get_notes_info(ids, cached=True)
     for n in notes:
         if not n:
             continue
@@ -228,11 +228,12 @@ def fix_estovalles():
 if __name__ == "__main__":
     print(f"🔧 Comprehensive cleanup of '{DECK}'...\n")
 
-    remove_duplicates()
-    delete_old_individuals()
-    fix_remaining()
-    add_missing_tags()
-    fix_estovalles()
+    with batch():
+        remove_duplicates()
+        delete_old_individuals()
+        fix_remaining()
+        add_missing_tags()
+        fix_estovalles()
 
     # Final count
     final = find_notes(f'deck:"{DECK}"')
@@ -1,13 +1,23 @@
 """
 dump_deck.py - Dump all notes from a deck to JSON for analysis
+
+Pass --offline to read from the local mirror (python anki_mirror.py sync)
+instead of Anki.
 """
 import json
-from anki_client import find_notes, get_notes_info
+import sys
+
+if "--offline" in sys.argv:
+    from anki_mirror import Mirror
+    mirror = Mirror()
+    find_notes, get_notes_info = mirror.find_notes, mirror.get_notes_info
+else:
+    from anki_client import find_notes, get_notes_info
 
 DECK = "cpnl basic 1"
 
 note_ids = find_notes('deck:"cpnl basic 1"')
-notes = get_notes_info(note_ids)
+notes = get_notes_info(note_ids, cached=True)
 
 with open('deck_dump.json', 'w', encoding='utf-8') as f:
     json.dump(notes, f, ensure_ascii=False, indent=2)
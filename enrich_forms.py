@@ -10,7 +10,7 @@ Format used in Back field:
 Only applies to cards in the dev deck. Run after fix_deck.py.
 """
 
-from anki_client import find_notes, get_notes_info, invoke
+from anki_client import find_notes, get_notes_info, invoke, batch
 
 DEV_DECK = "cpnl basic 1 [dev]"
 
@@ -97,4 +97,5 @@ def enrich_forms():
 
 
 if __name__ == "__main__":
-    enrich_forms()
+    with batch():
+        enrich_forms()
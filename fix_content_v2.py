@@ -14,7 +14,7 @@ Rule: Front = 100% Spanish, Back = 100% Catalan
 
 import sys, re
 sys.stdout.reconfigure(encoding='utf-8')
-from anki_client import find_notes, get_notes_info, invoke
+from anki_client import find_notes, get_notes_info, invoke, batch
 from card_helpers import verb_table
 
 LOG = []
@@ -284,30 +284,31 @@ FIELD_FIXES = {
 if __name__ == "__main__":
     log("=== Fixing card content ===")
 
-    for deck in ["cpnl basic 1 [dev]", "cpnl bàsic 2 [dev]"]:
-        ids = find_notes(f'deck:"{deck}"')
-        notes = get_notes_info(ids)
-        log(f"\n--- {deck} ({len(notes)} cards) ---")
-
-        for n in notes:
-            if not n: continue
-            front = n["fields"]["Front"]["value"].strip()
-
-            # Apply field fixes
-            if front in FIELD_FIXES:
-                update(n["noteId"], FIELD_FIXES[front])
-                log(f"  Fixed: [{front}]")
-
-            # Apply tags
-            if front in TAG_MAP:
-                tag([n["noteId"]], TAG_MAP[front])
-                log(f"  Tagged: [{front}] -> {TAG_MAP[front]}")
-
-            # Chunk cards in Front also need tags
-            for key in TAG_MAP:
-                if key in front and key != front:
-                    tag([n["noteId"]], TAG_MAP[key])
-                    break
+    with batch():
+        for deck in ["cpnl basic 1 [dev]", "cpnl bàsic 2 [dev]"]:
+            ids = find_notes(f'deck:"{deck}"')
+            notes = get_notes_info(ids)
+            log(f"\n--- {deck} ({len(notes)} cards) ---")
+
+            for n in notes:
+                if not n: continue
+                front = n["fields"]["Front"]["value"].strip()
+
+                # Apply field fixes
+                if front in FIELD_FIXES:
+                    update(n["noteId"], FIELD_FIXES[front])
+                    log(f"  Fixed: [{front}]")
+
+                # Apply tags
+                if front in TAG_MAP:
+                    tag([n["noteId"]], TAG_MAP[front])
+                    log(f"  Tagged: [{front}] -> {TAG_MAP[front]}")
+
+                # Chunk cards in Front also need tags
+                for key in TAG_MAP:
+                    if key in front and key != front:
+                        tag([n["noteId"]], TAG_MAP[key])
+                        break
 
     # Save log
     with open("fix_content_log.txt", "w", encoding="utf-8") as f:
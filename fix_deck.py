@@ -11,7 +11,7 @@ Run ONLY against the [dev] deck, never the original.
 """
 
 import json
-from anki_client import find_notes, get_notes_info, invoke
+from anki_client import find_notes, get_notes_info, invoke, batch
 
 DEV_DECK = "cpnl basic 1 [dev]"
 
@@ -182,17 +182,18 @@ def main():
 
     notes = get_notes_info(note_ids)
 
-    print("─── Phase 1: Fix translation errors & typos ───")
-    n1 = fix_fields(notes)
-    print(f"→ {n1} note(s) fixed.\n")
+    with batch():
+        print("─── Phase 1: Fix translation errors & typos ───")
+        n1 = fix_fields(notes)
+        print(f"→ {n1} note(s) fixed.\n")
 
-    print("─── Phase 2: Fix tags ───")
-    n2 = fix_tags(notes)
-    print(f"→ {n2} note(s) re-tagged.\n")
+        print("─── Phase 2: Fix tags ───")
+        n2 = fix_tags(notes)
+        print(f"→ {n2} note(s) re-tagged.\n")
 
-    print("─── Phase 3: Strip whitespace ───")
-    n3 = fix_whitespace(notes)
-    print(f"→ {n3} note(s) cleaned.\n")
+        print("─── Phase 3: Strip whitespace ───")
+        n3 = fix_whitespace(notes)
+        print(f"→ {n3} note(s) cleaned.\n")
 
     print(f"✅ Done! Total changes: {n1 + n2 + n3} note(s) updated.")
     print(f"\n👉 Open Anki and check '{DEV_DECK}' to verify.")
@@ -2,9 +2,18 @@
 inspect_deck.py
 ---------------
 Pull and display all notes from a deck for analysis.
+Pass --offline to read from the local mirror (python anki_mirror.py sync).
 """
 import json
-from anki_client import find_notes, get_notes_info, get_model_field_names, get_model_names
+import sys
+
+if "--offline" in sys.argv:
+    from anki_mirror import Mirror
+    mirror = Mirror()
+    find_notes, get_notes_info = mirror.find_notes, mirror.get_notes_info
+    get_model_field_names, get_model_names = mirror.get_model_field_names, mirror.get_model_names
+else:
+    from anki_client import find_notes, get_notes_info, get_model_field_names, get_model_names
 
 DECK = "cpnl basic 1"
 
@@ -23,7 +32,7 @@ def inspect(deck=DECK, limit=None):
 
     # Fetch note info
     sample = note_ids[:limit] if limit else note_ids
-    notes = get_notes_info(sample)
+    notes = get_notes_info(sample, cached=True)
 
     # Group by model
     by_model = {}
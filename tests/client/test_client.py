@@ -0,0 +1,190 @@
+"""
+Client-side tests (anki_client, NoteCache, anki_mirror, record/replay) run
+against anki_standin, so they need neither Anki nor docker. Python 3 only;
+run from the repository root with:
+
+    python3 -m unittest discover -s tests/client -v
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import TestCase
+
+import anki_client
+import anki_mirror
+import anki_standin
+import anki_transport
+
+
+class CountingTransport:
+    """Forwards to `inner` and remembers the action of every request."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.actions = []
+
+    def request(self, payload, timeout):
+        self.actions.append(json.loads(payload.decode("utf-8"))["action"])
+        return self.inner.request(payload, timeout)
+
+    def close(self):
+        self.inner.close()
+
+
+class StandinTestCase(TestCase):
+    """Each test gets a fresh, empty stand-in and a client pointed at it."""
+
+    def setUp(self):
+        self.server = anki_standin.serve_in_thread(port=0)
+        self.url = "http://127.0.0.1:{}".format(self.server.server_port)
+        anki_client.set_url(self.url)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        anki_client.set_transport(anki_client.ConnectionPool(anki_client.ANKI_CONNECT_URL))
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def count_requests(self):
+        transport = CountingTransport(anki_client.ConnectionPool(self.url))
+        anki_client.set_transport(transport)
+        return transport
+
+    def age(self, note_ids, seconds):
+        """
+        Move notes' `mod` back in time. `mod` has one-second resolution, so
+        this stands in for edits made a while apart.
+        """
+        anki = self.server.anki
+        with anki.lock, anki.db:
+            anki.db.execute("UPDATE notes SET mod = mod - ? WHERE id IN " + anki_standin.ids2str(note_ids), (seconds,))
+
+    def add_notes(self, count, deck="Default"):
+        notes = [{"deckName": deck, "modelName": "Basic", "fields": {"Front": "front {}".format(i), "Back": "back"}}
+                 for i in range(count)]
+        return anki_client.add_notes(notes)
+
+
+class TestVersion(StandinTestCase):
+
+    def test_version(self):
+        self.assertEqual(5, anki_client.invoke("version"))
+
+
+class TestBatch(StandinTestCase):
+
+    def test_futures_and_single_request(self):
+        ids = self.add_notes(3)
+        transport = self.count_requests()
+        with anki_client.batch():
+            futures = [anki_client.invoke("updateNoteFields", note={"id": nid, "fields": {"Back": "new"}})
+                       for nid in ids]
+            tagged = anki_client.invoke("addTags", notes=ids, tags="batched")
+        # The first merge checks once that the endpoint has updateNotesFields.
+        self.assertEqual(["updateNotesFields", "multi"], transport.actions)
+        self.assertEqual([None, None, None], [future.result() for future in futures])
+        self.assertEqual(None, tagged.result())
+        notes = anki_client.get_notes_info(ids)
+        self.assertEqual(["new"] * 3, [note["fields"]["Back"]["value"] for note in notes])
+        self.assertEqual([["batched"]] * 3, [note["tags"] for note in notes])
+
+    def test_read_sees_queued_write(self):
+        nid, = self.add_notes(1)
+        with anki_client.batch():
+            anki_client.invoke("updateNoteFields", note={"id": nid, "fields": {"Back": "queued"}})
+            note, = anki_client.get_notes_info([nid])
+        self.assertEqual("queued", note["fields"]["Back"]["value"])
+
+    def test_errors_raise_at_exit(self):
+        with self.assertRaises(Exception):
+            with anki_client.batch():
+                future = anki_client.invoke("updateNoteFields", note={"id": 1, "fields": {"Back": "x"}})
+        self.assertRaises(Exception, future.result)
+
+        with anki_client.batch(raise_errors=False):
+            future = anki_client.invoke("updateNoteFields", note={"id": 1, "fields": {"Back": "x"}})
+        self.assertRaises(Exception, future.result)
+
+    def test_order_kept_without_bulk_update(self):
+        del self.server.anki.actions["updateNotesFields"]
+        kept, deleted = self.add_notes(2)
+        with anki_client.batch():
+            updates = [anki_client.invoke("updateNoteFields", note={"id": nid, "fields": {"Back": "new"}})
+                       for nid in (kept, deleted)]
+            anki_client.invoke("deleteNotes", notes=[deleted])
+        self.assertEqual([None, None], [future.result() for future in updates])
+        self.assertEqual([kept], anki_client.find_notes("deck:Default"))
+        self.assertIn("updateNotesFields", anki_client._unsupported)
+
+
+class TestAdaptive(StandinTestCase):
+
+    def test_split_results_stay_aligned(self):
+        ids = self.add_notes(10)
+        transport = self.count_requests()
+        controller = anki_client.AdaptiveController(initial_size=3, step=0)
+        notes = anki_client.invoke_adaptive("notesInfo", controller=controller, notes=ids + [1])
+        self.assertEqual(4, transport.actions.count("notesInfo"))
+        self.assertEqual(ids, [note["noteId"] for note in notes[:-1]])
+        self.assertEqual({}, notes[-1])
+
+
+class TestNoteCache(StandinTestCase):
+
+    def test_only_changed_notes_are_refetched(self):
+        ids = self.add_notes(5)
+        self.age(ids, 10)
+        cache = anki_client.NoteCache(os.path.join(self.tmp.name, "notes.json"))
+        first = cache.get_notes_info(ids + [1])
+        self.assertEqual(anki_client.get_notes_info(ids + [1]), first)
+
+        anki_client.invoke("updateNoteFields", note={"id": ids[2], "fields": {"Back": "changed"}})
+        self.age([ids[2]], 5)
+
+        transport = self.count_requests()
+        notes = cache.get_notes_info(ids)
+        self.assertEqual(["notesModTime", "notesInfo"], transport.actions)
+        self.assertEqual("changed", notes[2]["fields"]["Back"]["value"])
+        self.assertEqual(ids, [note["noteId"] for note in notes])
+
+        transport.actions.clear()
+        cache.get_notes_info(ids)
+        self.assertEqual(["notesModTime"], transport.actions)
+
+
+class TestMirror(StandinTestCase):
+
+    def test_sync_and_read(self):
+        ids = self.add_notes(4)
+        mirror = anki_mirror.Mirror(os.path.join(self.tmp.name, "mirror.sqlite3"))
+        self.assertRaises(LookupError, mirror.find_notes, 'deck:"Default"')
+
+        self.assertEqual({"added": 4, "changed": 0, "deleted": 0}, mirror.sync(["Default"]))
+        self.assertEqual(sorted(ids), mirror.find_notes('deck:"Default"'))
+        self.assertEqual(anki_client.get_notes_info(ids), mirror.get_notes_info(ids))
+
+        self.age([ids[0]], 5)
+        anki_client.invoke("deleteNotes", notes=[ids[1]])
+        self.assertEqual({"added": 0, "changed": 1, "deleted": 1}, mirror.sync(["Default"]))
+        self.assertEqual([{}], mirror.get_notes_info([ids[1]]))
+        mirror.close()
+
+
+class TestRecordReplay(StandinTestCase):
+
+    def test_replay_without_anki(self):
+        path = os.path.join(self.tmp.name, "session.jsonl")
+        anki_client.set_transport(anki_transport.RecordingTransport(anki_client.ConnectionPool(self.url), path))
+        ids = self.add_notes(2)
+        recorded = anki_client.get_notes_info(ids)
+        anki_client.set_transport(anki_client.ConnectionPool(self.url))
+
+        self.server.shutdown()
+        replay = anki_transport.ReplayTransport(path)
+        anki_client.set_transport(replay)
+        self.assertEqual(ids, self.add_notes(2))
+        self.assertEqual(recorded, anki_client.get_notes_info(ids))
+        self.assertEqual(0, replay.remaining())
+        self.assertRaises(anki_transport.ReplayMiss, anki_client.get_notes_info, ids)
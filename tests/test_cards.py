@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+from unittest import TestCase
+from util import callAnkiConnectEndpoint
+
+class TestCardState(TestCase):
+
+    def test_areSuspended(self):
+        cards = addNoteCards('Basic')
+        callAnkiConnectEndpoint({'action': 'suspend', 'params': {'cards': cards}})
+        response = callAnkiConnectEndpoint({'action': 'areSuspended', 'params': {'cards': cards + [1]}})
+        self.assertEqual([True, None], response)
+
+    def test_areDue_missing(self):
+        response = callAnkiConnectEndpoint({'action': 'areDue', 'params': {'cards': [1, 2]}})
+        self.assertEqual([False, False], response)
+
+    def test_getIntervals_missing(self):
+        response = callAnkiConnectEndpoint({'action': 'getIntervals', 'params': {'cards': [1, 2]}})
+        self.assertEqual([0, 0], response)
+        response = callAnkiConnectEndpoint({'action': 'getIntervals', 'params': {'cards': [1, 2], 'complete': True}})
+        self.assertEqual([[], []], response)
+
+
+class TestSuspend(TestCase):
+
+    def test_suspend_missing(self):
+        response = callAnkiConnectEndpoint({'action': 'suspend', 'params': {'cards': [1, 2]}})
+        self.assertEqual([], response)
+        response = callAnkiConnectEndpoint({'action': 'unsuspend', 'params': {'cards': [1, 2]}})
+        self.assertEqual([], response)
+
+    def test_suspend_changed(self):
+        cards = addNoteCards('Basic')
+        response = callAnkiConnectEndpoint({'action': 'suspend', 'params': {'cards': cards}})
+        self.assertEqual(cards, response)
+        response = callAnkiConnectEndpoint({'action': 'suspend', 'params': {'cards': cards}})
+        self.assertEqual([], response)
+        response = callAnkiConnectEndpoint({'action': 'unsuspend', 'params': {'cards': cards}})
+        self.assertEqual(cards, response)
+        response = callAnkiConnectEndpoint({'action': 'areSuspended', 'params': {'cards': cards}})
+        self.assertEqual([False], response)
+
+
+def addNoteCards(modelName):
+    front = 'cards front {}'.format(time.time())
+    note = {'deckName': 'Default', 'modelName': modelName, 'fields': {'Front': front, 'Back': 'back'}, 'tags': []}
+    noteId = callAnkiConnectEndpoint({'action': 'addNote', 'params': {'note': note}})
+    return callAnkiConnectEndpoint({'action': 'findCards', 'params': {'query': 'nid:{}'.format(noteId)}})
+
+
+class TestCardsInfo(TestCase):
+
+    def test_cardsInfo_render(self):
+        cards = addNoteCards('Basic')
+        response = callAnkiConnectEndpoint({'action': 'cardsInfo', 'params': {'cards': cards}})
+        self.assertTrue('question' in response[0] and 'answer' in response[0] and 'css' in response[0])
+
+        response = callAnkiConnectEndpoint({'action': 'cardsInfo', 'params': {'cards': cards, 'render': False}})
+        self.assertFalse('question' in response[0] or 'answer' in response[0])
+        self.assertEqual('back', response[0]['fields']['Back']['value'])
+
+    def test_cardsInfo_css_model(self):
+        basic = addNoteCards('Basic') + addNoteCards('Basic')
+        reverse = addNoteCards('Basic (and reversed card)')
+        cards = [basic[0], reverse[0], basic[1], reverse[1], 1]
+        response = callAnkiConnectEndpoint({'action': 'cardsInfo', 'params': {'cards': cards, 'css': 'model'}})
+        self.assertEqual([True, True, False, False, False], ['css' in info for info in response])
+        self.assertEqual({}, response[4])
+
+        response = callAnkiConnectEndpoint({'action': 'cardsInfo', 'params': {'cards': cards, 'css': False}})
+        self.assertEqual([False] * 5, ['css' in info for info in response])
@@ -13,4 +13,10 @@ class TestGetDeckConfig(TestCase):
     
     def test_getDeckConfig(self):
         response = callAnkiConnectEndpoint({'action': 'getDeckConfig', 'params': {'deck': 'Default'}})
-        self.assertDictContainsSubset({'name': 'Default', 'replayq': True}, response)
\ No newline at end of file
+        self.assertDictContainsSubset({'name': 'Default', 'replayq': True}, response)
+
+class TestGetDecks(TestCase):
+
+    def test_getDecks_missing(self):
+        response = callAnkiConnectEndpoint({'action': 'getDecks', 'params': {'cards': [1, 2]}})
+        self.assertEqual({}, response)
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import json
+import socket
 import unittest
 from unittest import TestCase
 from util import callAnkiConnectEndpoint
@@ -8,3 +10,46 @@ class TestVersion(TestCase):
     def test_version(self):
         response = callAnkiConnectEndpoint({'action': 'version'})
         self.assertEqual(5, response)
+
+
+class TestMulti(TestCase):
+
+    def test_multi(self):
+        response = callAnkiConnectEndpoint({
+            'action': 'multi',
+            'params': {'actions': [
+                {'action': 'version'},
+                {'action': 'version', 'version': 5},
+                {'action': 'noSuchAction', 'version': 5}
+            ]}
+        })
+        self.assertEqual([5, {'result': 5, 'error': None}, {'result': None, 'error': 'unsupported action'}], response)
+
+
+class TestPipelining(TestCase):
+
+    def makeRequest(self, data, extra=''):
+        body = json.dumps(data)
+        return 'POST / HTTP/1.1\r\nContent-Length: {}\r\n{}\r\n{}'.format(len(body), extra, body)
+
+    def test_pipelined_requests(self):
+        requests = (
+            self.makeRequest({'action': 'version'}) +
+            self.makeRequest({'action': 'noSuchAction', 'version': 5}) +
+            self.makeRequest({'action': 'version', 'version': 5}, 'Connection: close\r\n')
+        )
+
+        sock = socket.create_connection(('docker', 8888))
+        sock.sendall(requests[:10])
+        sock.sendall(requests[10:])
+
+        response = ''
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                break
+            response += data
+        sock.close()
+
+        bodies = [json.loads(part.split('\r\n\r\n', 1)[1]) for part in response.split('HTTP/1.1 200 OK')[1:]]
+        self.assertEqual([5, {'result': None, 'error': 'unsupported action'}, {'result': 5, 'error': None}], bodies)
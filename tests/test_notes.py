@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+from unittest import TestCase
+from util import callAnkiConnectEndpoint
+
+class TestNotesModTime(TestCase):
+
+    def test_notesModTime_missing(self):
+        response = callAnkiConnectEndpoint({'action': 'notesModTime', 'params': {'notes': [1, 2]}})
+        self.assertEqual([{}, {}], response)
+
+
+class TestNotesInfo(TestCase):
+
+    def test_notesInfo_missing(self):
+        response = callAnkiConnectEndpoint({'action': 'notesInfo', 'params': {'notes': [1, 2]}})
+        self.assertEqual([{}, {}], response)
+
+    def test_notesInfo_mixed(self):
+        front = 'notesInfo front {}'.format(time.time())
+        note = {'deckName': 'Default', 'modelName': 'Basic', 'fields': {'Front': front, 'Back': 'back'}, 'tags': ['notesinfo']}
+        noteId = callAnkiConnectEndpoint({'action': 'addNote', 'params': {'note': note}})
+        cards = callAnkiConnectEndpoint({'action': 'findCards', 'params': {'query': 'nid:{}'.format(noteId)}})
+
+        response = callAnkiConnectEndpoint({'action': 'notesInfo', 'params': {'notes': [1, noteId, 2, noteId]}})
+        self.assertEqual(4, len(response))
+        self.assertEqual({}, response[0])
+        self.assertEqual({}, response[2])
+        self.assertEqual(response[1], response[3])
+
+        info = response[1]
+        self.assertEqual(noteId, info['noteId'])
+        self.assertEqual('Basic', info['modelName'])
+        self.assertEqual({'Front': {'value': front, 'order': 0}, 'Back': {'value': 'back', 'order': 1}}, info['fields'])
+        self.assertEqual(['notesinfo'], info['tags'])
+        self.assertEqual(cards, info['cards'])
+        self.assertTrue(info['mod'] > 0)
+
+
+class TestAddNotes(TestCase):
+
+    def test_addNotes_positional(self):
+        front = 'addNotes front {}'.format(time.time())
+        note = {'deckName': 'Default', 'modelName': 'Basic', 'fields': {'Front': front, 'Back': 'back'}, 'tags': []}
+        missingDeck = dict(note, deckName='No such deck')
+        response = callAnkiConnectEndpoint({'action': 'addNotes', 'params': {'notes': [missingDeck, note, note]}})
+        self.assertEqual(None, response[0])
+        self.assertTrue(response[1])
+        self.assertEqual(None, response[2])
+
+    def test_addNotes_unreachableAudio(self):
+        # The note is still added, without audio, once the download fails.
+        front = 'addNotes audio front {}'.format(time.time())
+        audio = {'url': 'http://127.0.0.1:1/missing.mp3', 'filename': 'missing.mp3', 'fields': ['Front']}
+        note = {'deckName': 'Default', 'modelName': 'Basic', 'fields': {'Front': front, 'Back': 'back'}, 'tags': [], 'audio': audio}
+        response = callAnkiConnectEndpoint({'action': 'multi', 'params': {'actions': [
+            {'action': 'addNotes', 'params': {'notes': [note]}},
+            {'action': 'version'}
+        ]}})
+        self.assertTrue(response[0][0])
+        self.assertEqual(5, response[1])
+
+
+class TestUpdateNotesFields(TestCase):
+
+    def test_updateNotesFields_missing(self):
+        response = callAnkiConnectEndpoint({'action': 'updateNotesFields', 'params': {'notes': [{'id': 1, 'fields': {'Front': 'x'}}]}})
+        self.assertEqual([False], response)
@@ -14,7 +14,7 @@ Run with Anki open. Don't close the black window (~2-3 min).
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
-from anki_client import find_notes, get_notes_info, invoke
+from anki_client import find_notes, get_notes_info, invoke, batch
 from card_helpers import verb_table
 
 LOG = []
@@ -85,14 +85,15 @@ def restyle_verbs():
     idx_verbs = {n["fields"]["Front"]["value"].strip(): n
                  for n in get_notes_info(find_notes('deck:"Verbs Essencials"')) if n}
 
-    for front, (cat_inf, forms) in VERB_DATA.items():
-        note = idx_verbs.get(front)
-        if not note:
-            log(f"  [{front}] not found, skipping")
-            continue
-        new_back = verb_table(cat_inf, forms)
-        invoke("updateNoteFields", note={"id": note["noteId"], "fields": {"Back": new_back}})
-        log(f"  [{front}] restyled")
+    with batch():
+        for front, (cat_inf, forms) in VERB_DATA.items():
+            note = idx_verbs.get(front)
+            if not note:
+                log(f"  [{front}] not found, skipping")
+                continue
+            new_back = verb_table(cat_inf, forms)
+            invoke("updateNoteFields", note={"id": note["noteId"], "fields": {"Back": new_back}})
+            log(f"  [{front}] restyled")
 
 
 # =========================================================================